@@ -0,0 +1,201 @@
+# Autopilot: steers a snake to the food with breadth-first search over the
+# wrapped board. Nothing here imports pygame; it reads the shared
+# OccupancyGrid, so it drives the windowed game and GameEngine alike.
+#
+# The search knows the body moves: the segment k cells behind the head
+# leaves its cell after (length - k) moves, so a path may run through the
+# body where the tail will be gone by the time the head arrives.
+#
+# A plan is kept between ticks and only its next step is checked, as long
+# as the snake followed it and the food and walls stayed put. A step that
+# became blocked is repaired by searching from the head back onto the rest
+# of the path. A path to the food is only taken if the snake would still
+# have room after eating. Otherwise, or when the food can't be reached, the
+# snake falls back to following its tail, which always moves out of the
+# way: of the moves that keep the tail reachable it takes the one farthest
+# from the tail, so the body stretches out and keeps changing shape until a
+# safe path opens up. Failing that it takes the move with the most room.
+# Food in a pocket too small for the snake never gets a safe path, so after
+# a board's worth of fallback moves the risky one is taken anyway; this is
+# a stress generator, a game that ends is better than one that stalls.
+from collections import deque
+
+from snake_engine import BARRIER_CELL
+
+class Autopilot:
+    def __init__(self):
+        self.path = deque()  # Cell indices still to visit, next move first
+        self.food = None  # Target the path leads to
+        self.barrier_cells = None  # grid.barrier_cells the path was planned around
+        self.expected_head = None  # Where the head is if the last move was taken
+        self.waited = 0  # Fallback moves since the food was last in reach
+        self.plans = 0  # Full searches so far
+        self.repairs = 0
+
+    def choose(self, grid, positions, food, length=None):
+        # Direction for the next move, or None when boxed in. `positions` is
+        # the body, head first; `length` the length it is growing to
+        # (default: not growing).
+        if length is None:
+            length = len(positions)
+        head = index(grid, positions[0])
+        if (self.path and head == self.expected_head and food == self.food
+                and grid.barrier_cells is self.barrier_cells):
+            if not passable_now(grid, positions, self.path[0]):
+                self._repair(grid, positions, length)
+        else:
+            self._plan(grid, positions, length, food)
+
+        if self.path:
+            self.waited = 0
+            step = self.path.popleft()
+        else:
+            self.waited += 1
+            step = self._fallback(grid, positions, length)
+        self.expected_head = step
+        if step is None:
+            return None
+        return direction_between(grid, head, step)
+
+    def _plan(self, grid, positions, length, food):
+        self.plans += 1
+        self.food = food
+        self.barrier_cells = grid.barrier_cells
+        self.path = deque()
+        path = search(grid, positions, length, {index(grid, food)})
+        if path and (self.waited > grid.width * grid.height
+                     or room_after(grid, positions, length, path)):
+            self.path = deque(path)
+
+    def _repair(self, grid, positions, length):
+        # Search from the head to the nearest cell further along the old
+        # path and splice the detour onto the rest of it
+        self.repairs += 1
+        rest = list(self.path)[1:]
+        detour = search(grid, positions, length, set(rest)) if rest else None
+        if detour is None:
+            self.path = deque()
+        else:
+            self.path = deque(detour + rest[rest.index(detour[-1]) + 1:])
+
+    def _fallback(self, grid, positions, length):
+        # One move at a time, so this is re-planned every tick
+        food = index(grid, self.food)
+        tail = index(grid, positions[-1])
+        neck = index(grid, positions[1]) if len(positions) > 1 else -1
+        moves = [j for j in neighbours(grid, index(grid, positions[0]))
+                 if j != neck and passable_now(grid, positions, j)]
+        safe = [j for j in moves if room_after(grid, positions, length, [j], j == food)]
+        if safe:
+            return max(safe, key=lambda j: torus_distance(grid, j, tail))
+        best = None
+        best_room = -1
+        for j in moves:
+            room = free_area(grid, j, set(), len(positions))
+            if room > best_room:
+                best, best_room = j, room
+        return best
+
+def index(grid, pos):
+    return grid.width * pos[1] + pos[0]
+
+def neighbours(grid, i):
+    # The board wraps at its edges
+    width = grid.width
+    size = width * grid.height
+    x = i % width
+    row = i - x
+    return (row + (x + 1) % width, row + (x - 1) % width, (i + width) % size, (i - width) % size)
+
+def direction_between(grid, a, b):
+    # Direction of the move from cell a to its neighbour b
+    dx = (b % grid.width - a % grid.width + 1) % grid.width - 1
+    dy = (b // grid.width - a // grid.width + 1) % grid.height - 1
+    return (dx, dy)
+
+def passable_now(grid, positions, i):
+    # The game's rule for the next move (see Snake.update)
+    if grid.cells[i] & BARRIER_CELL:
+        return False
+    pos = (i % grid.width, i // grid.width)
+    head_hits = sum(1 for k in range(min(3, len(positions))) if positions[k] == pos)
+    return grid.snake[i] <= head_hits
+
+def clear_after(grid, positions, length):
+    # Body cell -> first move the head may enter it on. The segment k behind
+    # the head is still there while move (length - k) is checked; where the
+    # body folds onto itself the later segment counts.
+    clear = {}
+    for k, pos in enumerate(positions):
+        i = index(grid, pos)
+        move = length - k + 1
+        if clear.get(i, 0) < move:
+            clear[i] = move
+    return clear
+
+def search(grid, positions, length, targets):
+    # Shortest path from the head to any cell in `targets`, as a list of cell
+    # indices with the first move first, or None
+    cells = grid.cells
+    clear = clear_after(grid, positions, length)
+    start = index(grid, positions[0])
+    # The first move can't turn straight back onto the neck
+    neck = index(grid, positions[1]) if len(positions) > 1 else -1
+    parent = {start: -1}
+    queue = deque([(start, 0)])
+    while queue:
+        i, moves = queue.popleft()
+        moves += 1
+        for j in neighbours(grid, i):
+            if j in parent or cells[j] & BARRIER_CELL or moves < clear.get(j, 0):
+                continue
+            if moves == 1 and j == neck:
+                continue
+            parent[j] = i
+            if j in targets:
+                path = [j]
+                while parent[path[-1]] != start:
+                    path.append(parent[path[-1]])
+                path.reverse()
+                return path
+            queue.append((j, moves))
+    return None
+
+def torus_distance(grid, a, b):
+    dx = abs(a % grid.width - b % grid.width)
+    dy = abs(a // grid.width - b // grid.width)
+    return min(dx, grid.width - dx) + min(dy, grid.height - dy)
+
+def room_after(grid, positions, length, path, eats=True):
+    # After following `path` (and eating at its end), can the snake still get
+    # out? The body then is the path (reversed) plus the front of the old
+    # body; it's safe if the free area around the head reaches the new tail
+    # or is at least as big as the snake.
+    length += eats
+    body = [index(grid, p) for p in positions]
+    after = path[::-1] + body[:max(0, length - len(path))]
+    after = after[:length]
+    tail = after[-1]
+    occupied = set(after)
+    occupied.discard(tail)
+    return free_area(grid, path[-1], occupied, length, tail) >= length
+
+def free_area(grid, start, occupied, limit, goal=None):
+    # Cells reachable from `start` avoiding walls and `occupied` (the live
+    # snake when empty), counted up to `limit`; reaching `goal` counts as
+    # having all the room needed
+    cells = grid.cells
+    snake = grid.snake
+    seen = {start}
+    queue = deque([start])
+    while queue and len(seen) < limit:
+        for j in neighbours(grid, queue.popleft()):
+            if j == goal:
+                return limit
+            if j in seen or cells[j] & BARRIER_CELL:
+                continue
+            if j in occupied or (not occupied and snake[j]):
+                continue
+            seen.add(j)
+            queue.append(j)
+    return len(seen)
@@ -0,0 +1,113 @@
+# File writes moved off the game loop. Callers submit (target, item) pairs;
+# a worker thread drains the queue in batches and hands each target its
+# items in submission order through target.write_batch(items, fsync).
+# Targets that may be written without fsync also provide sync().
+#
+# flush() waits until everything submitted so far is written; close() flushes
+# and stops the thread. Both are safe to call more than once.
+import atexit
+import queue
+import sys
+import threading
+
+# When written data is forced to disk
+FSYNC_BATCH = "batch"  # After every batch: survives power loss, costs one fsync per batch
+FSYNC_CLOSE = "close"  # Only on flush()/close(); a crash of the OS may lose recent games
+FSYNC_NEVER = "never"  # Leave it to the OS
+FSYNC_POLICIES = (FSYNC_BATCH, FSYNC_CLOSE, FSYNC_NEVER)
+
+DEFAULT_QUEUE_SIZE = 256  # Pending writes before submit() blocks
+DEFAULT_BATCH_SIZE = 64  # Writes handled per wake-up
+FLUSH_POLL_SECONDS = 0.5  # How often flush() checks that the worker is still alive
+
+_FLUSH = object()
+_STOP = object()
+
+class BackgroundWriter:
+    def __init__(self, fsync=FSYNC_BATCH, queue_size=DEFAULT_QUEUE_SIZE,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy: {fsync}")
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.queue = queue.Queue(queue_size)
+        self.unsynced = []  # Targets written without fsync since the last flush
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="background-writer", daemon=True)
+        self.thread.start()
+        # Still flush if the program exits without calling close()
+        atexit.register(self.close)
+
+    def submit(self, target, item):
+        if self.closed:
+            raise RuntimeError("writer is closed")
+        self.queue.put((target, item))
+
+    def flush(self):
+        if self.closed:
+            return
+        done = threading.Event()
+        self.queue.put((_FLUSH, done))
+        # Don't wait forever on a worker that has died
+        while not done.wait(FLUSH_POLL_SECONDS):
+            if not self.thread.is_alive():
+                return
+
+    def close(self):
+        if self.closed:
+            return
+        self.flush()
+        self.closed = True
+        self.queue.put((_STOP, None))
+        self.thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not self._write(batch):
+                return
+
+    def _write(self, batch):
+        # Returns False once the stop marker has been seen
+        pending = {}  # target -> items, insertion ordered
+        flushes = []
+        running = True
+        for target, item in batch:
+            if target is _FLUSH:
+                flushes.append(item)
+            elif target is _STOP:
+                running = False
+            else:
+                pending.setdefault(target, []).append(item)
+
+        try:
+            fsync = self.fsync == FSYNC_BATCH
+            for target, items in pending.items():
+                try:
+                    target.write_batch(items, fsync)
+                except Exception as e:
+                    # Neither a failing disk nor a broken target may take the
+                    # game or the worker down with it
+                    print(f"Background write failed: {e!r}", file=sys.stderr)
+                    continue
+                if not fsync and target not in self.unsynced:
+                    self.unsynced.append(target)
+
+            if flushes and self.fsync == FSYNC_CLOSE:
+                for target in self.unsynced:
+                    try:
+                        target.sync()
+                    except Exception as e:
+                        print(f"Background sync failed: {e!r}", file=sys.stderr)
+                self.unsynced = []
+        finally:
+            # Whatever happened, nobody is left waiting on these
+            for done in flushes:
+                done.set()
+        return running
@@ -0,0 +1,297 @@
+# Many headless snake games advanced together with NumPy, for evaluating AI
+# agents. The rules match GameEngine / Snake.update: wrap-around moves,
+# self-collision from the fourth segment, barrier death, growth after eating,
+# bonus food with BONUS_FOOD_CHANCE and a new wall layout every 10 length,
+# opened up like level_cells so no free cell is sealed off. Moves are
+# vectorized here; the rare layout that needs opening goes through
+# snake_engine's open_sealed_regions. Randomness comes from NumPy, so a seed
+# doesn't play the same games as GameEngine.
+#
+#   env = BatchSnakeEnv(4096, seed=0)
+#   rewards, dones = env.step(actions)  # actions: -1 keep going, 0..3 = DIRECTIONS
+#
+# Finished games are reset in place; their final score, level and length stay
+# readable in final_score / final_level / final_length until they end again.
+import numpy as np
+
+from snake_engine import (GRID_WIDTH, GRID_HEIGHT, UP, DOWN, LEFT, RIGHT, MOVE_INTERVAL_MS,
+                          BONUS_FOOD_POINTS, BONUS_FOOD_CHANCE, BONUS_FOOD_DURATION,
+                          BASE_NUM_BARRIERS, MIN_WALL_LENGTH, MAX_WALL_LENGTH,
+                          HIT_BARRIER, HIT_SELF, BOARD_FULL, open_sealed_regions)
+
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+DX = np.array([d[0] for d in DIRECTIONS], dtype=np.int32)
+DY = np.array([d[1] for d in DIRECTIONS], dtype=np.int32)
+OPPOSITE = np.array([1, 0, 3, 2], dtype=np.int8)
+
+NUM_CELLS = GRID_WIDTH * GRID_HEIGHT
+NO_CELL = -1
+START_CELL = (GRID_HEIGHT // 2) * GRID_WIDTH + GRID_WIDTH // 2  # The head's first cell
+
+# Cause codes for the `cause` array
+CAUSES = [None, HIT_BARRIER, HIT_SELF, BOARD_FULL]
+CAUSE_BARRIER = 1
+CAUSE_SELF = 2
+CAUSE_BOARD_FULL = 3
+
+# Cell codes returned by observe()
+EMPTY, BARRIER, BODY, HEAD, FOOD, BONUS_FOOD = range(6)
+
+# Random cell draws tried per game before falling back to a full scan
+SPAWN_ATTEMPTS = 8
+
+class BatchSnakeEnv:
+    def __init__(self, num_envs, seed=None, auto_reset=True):
+        self.num_envs = num_envs
+        self.auto_reset = auto_reset
+        self.rng = np.random.default_rng(seed)
+        n = num_envs
+        self.barrier = np.zeros((n, NUM_CELLS), dtype=bool)
+        self.snake_count = np.zeros((n, NUM_CELLS), dtype=np.int16)
+        # Ring buffer of body cells; the head is at body[g, head_ptr[g]]
+        self.body = np.zeros((n, NUM_CELLS), dtype=np.int32)
+        self.head_ptr = np.zeros(n, dtype=np.int32)
+        self.body_len = np.zeros(n, dtype=np.int32)
+        self.length = np.zeros(n, dtype=np.int32)
+        self.direction = np.zeros(n, dtype=np.int8)
+        self.food = np.zeros(n, dtype=np.int32)
+        self.bonus = np.full(n, NO_CELL, dtype=np.int32)
+        self.bonus_tick = np.zeros(n, dtype=np.int64)
+        self.score = np.zeros(n, dtype=np.int32)
+        self.level = np.zeros(n, dtype=np.int32)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.cause = np.zeros(n, dtype=np.int8)
+        self.final_score = np.zeros(n, dtype=np.int32)
+        self.final_level = np.zeros(n, dtype=np.int32)
+        self.final_length = np.zeros(n, dtype=np.int32)
+        self.reset()
+
+    def reset(self, games=None):
+        games = np.arange(self.num_envs) if games is None else np.asarray(games)
+        if games.size == 0:
+            return
+        self.barrier[games] = False
+        self.snake_count[games] = 0
+        # Snake starts mid-board heading right, 3 segments long
+        cx, cy = GRID_WIDTH // 2, GRID_HEIGHT // 2
+        start = np.array([cy * GRID_WIDTH + cx - 2, cy * GRID_WIDTH + cx - 1, cy * GRID_WIDTH + cx])
+        self.body[games, :3] = start
+        self.snake_count[games[:, None], start[None, :]] = 1
+        self.head_ptr[games] = 2
+        self.body_len[games] = 3
+        self.length[games] = 3
+        self.direction[games] = DIRECTIONS.index(RIGHT)
+        self.bonus[games] = NO_CELL
+        self.score[games] = 0
+        self.level[games] = 1
+        self.ticks[games] = 0
+        self.cause[games] = 0
+        self._build_walls(games)
+        self.food[games] = NO_CELL
+        self._place(games, self.food)
+
+    def step(self, actions):
+        # Advance every game one move. Returns (rewards, dones): score gained
+        # this move and whether the game ended on it.
+        n = self.num_envs
+        rows = np.arange(n)
+        actions = np.asarray(actions)
+        turn = (actions >= 0) & (actions != OPPOSITE[self.direction])
+        self.direction[turn] = actions[turn]
+        self.ticks += 1
+
+        head = self.body[rows, self.head_ptr]
+        nx = (head % GRID_WIDTH + DX[self.direction]) % GRID_WIDTH
+        ny = (head // GRID_WIDTH + DY[self.direction]) % GRID_HEIGHT
+        next_head = ny * GRID_WIDTH + nx
+
+        hit_barrier = self.barrier[rows, next_head]
+        # Body from the fourth segment on: every hit beyond those in the first three
+        head_hits = np.zeros(n, dtype=np.int16)
+        for k in range(3):
+            head_hits += self.body[rows, (self.head_ptr - k) % NUM_CELLS] == next_head
+        hit_self = ~hit_barrier & (self.snake_count[rows, next_head] > head_hits)
+        self.cause[hit_barrier] = CAUSE_BARRIER
+        self.cause[hit_self] = CAUSE_SELF
+        dones = hit_barrier | hit_self
+        rewards = np.zeros(n, dtype=np.int32)
+
+        alive = rows[~dones]
+        moved = next_head[alive]
+        self.head_ptr[alive] = (self.head_ptr[alive] + 1) % NUM_CELLS
+        self.body[alive, self.head_ptr[alive]] = moved
+        self.snake_count[alive, moved] += 1
+        self.body_len[alive] += 1
+        shrink = alive[self.body_len[alive] > self.length[alive]]
+        tail_ptr = (self.head_ptr[shrink] - self.body_len[shrink] + 1) % NUM_CELLS
+        self.snake_count[shrink, self.body[shrink, tail_ptr]] -= 1
+        self.body_len[shrink] -= 1
+
+        ate = alive[moved == self.food[alive]]
+        if ate.size:
+            self.length[ate] += 1
+            self.score[ate] += 1
+            rewards[ate] += 1
+            self.food[ate] = NO_CELL
+            full = ate[~self._place(ate, self.food)]
+            self.cause[full] = CAUSE_BOARD_FULL
+            dones[full] = True
+            ate = ate[self.food[ate] != NO_CELL]
+            spawn = ate[(self.bonus[ate] == NO_CELL) & (self.rng.random(ate.size) < BONUS_FOOD_CHANCE)]
+            self.bonus_tick[spawn] = self.ticks[spawn]
+            self._place(spawn, self.bonus)
+            level_up = ate[self.length[ate] % 10 == 0]
+            if level_up.size:
+                self.level[level_up] += 1
+                self.barrier[level_up] = False
+                self._build_walls(level_up)
+                # The new walls may cover the food that was just placed
+                covered = level_up[self.barrier[level_up, self.food[level_up]]]
+                self.food[covered] = NO_CELL
+                full = covered[~self._place(covered, self.food)]
+                self.cause[full] = CAUSE_BOARD_FULL
+                dones[full] = True
+
+        has_bonus = alive[self.bonus[alive] != NO_CELL]
+        got_bonus = has_bonus[next_head[has_bonus] == self.bonus[has_bonus]]
+        self.score[got_bonus] += BONUS_FOOD_POINTS
+        rewards[got_bonus] += BONUS_FOOD_POINTS
+        self.bonus[got_bonus] = NO_CELL
+        expired = has_bonus[(self.ticks[has_bonus] - self.bonus_tick[has_bonus]) * MOVE_INTERVAL_MS
+                            > BONUS_FOOD_DURATION]
+        self.bonus[expired] = NO_CELL
+
+        finished = rows[dones]
+        if finished.size:
+            self.final_score[finished] = self.score[finished]
+            self.final_level[finished] = self.level[finished]
+            self.final_length[finished] = self.length[finished]
+            if self.auto_reset:
+                self.reset(finished)
+        return rewards, dones
+
+    def observe(self):
+        # (num_envs, GRID_HEIGHT, GRID_WIDTH) board of cell codes
+        rows = np.arange(self.num_envs)
+        board = np.where(self.barrier, BARRIER, EMPTY).astype(np.int8)
+        board[self.snake_count > 0] = BODY
+        board[rows, self.body[rows, self.head_ptr]] = HEAD
+        has_food = rows[self.food != NO_CELL]
+        board[has_food, self.food[has_food]] = FOOD
+        has_bonus = rows[self.bonus != NO_CELL]
+        board[has_bonus, self.bonus[has_bonus]] = BONUS_FOOD
+        return board.reshape(self.num_envs, GRID_HEIGHT, GRID_WIDTH)
+
+    def _free(self, games, cells):
+        return (~self.barrier[games, cells] & (self.snake_count[games, cells] == 0)
+                & (self.food[games] != cells) & (self.bonus[games] != cells))
+
+    def _place(self, games, target):
+        # Put target[g] on a random free cell for each game; returns which
+        # games found one. A few vectorized random draws settle almost every
+        # game, the rest scan their board so a full board is detected.
+        placed = np.zeros(games.size, dtype=bool)
+        pending = np.arange(games.size)
+        for _ in range(SPAWN_ATTEMPTS):
+            if pending.size == 0:
+                return placed
+            cells = self.rng.integers(0, NUM_CELLS, pending.size)
+            ok = self._free(games[pending], cells)
+            target[games[pending[ok]]] = cells[ok]
+            placed[pending[ok]] = True
+            pending = pending[~ok]
+        for p in pending:
+            g = games[p]
+            free = np.flatnonzero(~self.barrier[g] & (self.snake_count[g] == 0))
+            free = free[(free != self.food[g]) & (free != self.bonus[g])]
+            if free.size:
+                target[g] = free[self.rng.integers(free.size)]
+                placed[p] = True
+        return placed
+
+    def _build_walls(self, games):
+        # create_barriers for every game in `games`, vectorized per level
+        for level in np.unique(self.level[games]):
+            group = games[self.level[games] == level]
+            k = group.size
+            walls = BASE_NUM_BARRIERS + (int(level) - 1) * 2  # Add 2 more barriers per level
+            horizontal = self.rng.random((k, walls)) < 0.5
+            start_x = np.where(horizontal,
+                               self.rng.integers(2, GRID_WIDTH - MAX_WALL_LENGTH - 2, (k, walls), endpoint=True),
+                               self.rng.integers(2, GRID_WIDTH - 2, (k, walls), endpoint=True))
+            start_y = np.where(horizontal,
+                               self.rng.integers(2, GRID_HEIGHT - 2, (k, walls), endpoint=True),
+                               self.rng.integers(2, GRID_HEIGHT - MAX_WALL_LENGTH - 2, (k, walls), endpoint=True))
+            wall_length = self.rng.integers(MIN_WALL_LENGTH, MAX_WALL_LENGTH, (k, walls), endpoint=True)
+            step = np.arange(MAX_WALL_LENGTH)
+            xs = start_x[..., None] + np.where(horizontal[..., None], step, 0)
+            ys = start_y[..., None] + np.where(horizontal[..., None], 0, step)
+            # Avoid center area where snake starts
+            keep = ((step < wall_length[..., None])
+                    & ((np.abs(xs - GRID_WIDTH // 2) > 3) | (np.abs(ys - GRID_HEIGHT // 2) > 3)))
+            owner = np.broadcast_to(group[:, None, None], keep.shape)
+            self.barrier[owner[keep], (ys * GRID_WIDTH + xs)[keep]] = True
+            sealed = self._may_seal(group, horizontal, start_x, start_y, wall_length)
+            for g in group[sealed]:
+                walls = bytearray(self.barrier[g].view(np.uint8))
+                if open_sealed_regions(walls, GRID_WIDTH, GRID_HEIGHT, START_CELL):
+                    self.barrier[g] = np.frombuffer(walls, np.uint8).astype(bool)
+
+    def _may_seal(self, games, horizontal, start_x, start_y, wall_length):
+        # snake_engine's Euler test on every game at once: the walls enclose
+        # free cells iff E - V + C exceeds the 2x2 blocks of wall. Walls stay
+        # off the board edge, so nothing closes a loop around the wrap. Only
+        # games whose wall pieces touch in a cycle can enclose anything, so
+        # only those are counted on the board.
+        components, looped = self._wall_pieces(horizontal, start_x, start_y, wall_length)
+        sealed = np.zeros(games.size, dtype=bool)
+        if not looped.any():
+            return sealed
+        b = self.barrier[games[looped]].reshape(-1, GRID_HEIGHT, GRID_WIDTH)
+        right = b[:, :, :-1] & b[:, :, 1:]
+        below = b[:, :-1] & b[:, 1:]
+        # A diagonal only where neither cell beside it is a wall
+        down_right = b[:, :-1, :-1] & b[:, 1:, 1:] & ~b[:, :-1, 1:] & ~b[:, 1:, :-1]
+        down_left = b[:, :-1, 1:] & b[:, 1:, :-1] & ~b[:, :-1, :-1] & ~b[:, 1:, 1:]
+        blocks = right[:, :-1] & right[:, 1:]
+        edges = (right.sum((1, 2)) + below.sum((1, 2)) + down_right.sum((1, 2))
+                 + down_left.sum((1, 2)))
+        sealed[looped] = edges - b.sum((1, 2)) + components[looped] > blocks.sum((1, 2))
+        return sealed
+
+    def _wall_pieces(self, horizontal, start_x, start_y, wall_length):
+        # The walls as straight pieces: the centre gap splits a wall into at
+        # most a first and a second piece, and two pieces touch (8-connected)
+        # when their boxes, grown by a cell, overlap. Returns each game's
+        # number of connected components and whether the touching pieces
+        # form a cycle.
+        cx, cy = GRID_WIDTH // 2, GRID_HEIGHT // 2
+        along_start = np.where(horizontal, start_x, start_y)
+        along_end = along_start + wall_length - 1
+        across = np.where(horizontal, start_y, start_x)
+        centre_along = np.where(horizontal, cx, cy)
+        gap = np.abs(across - np.where(horizontal, cy, cx)) <= 3
+        first_end = np.where(gap, np.minimum(along_end, centre_along - 4), along_end)
+        second_start = np.where(gap, np.maximum(along_start, centre_along + 4), along_end + 1)
+        lo = np.concatenate([along_start, second_start], 1)
+        hi = np.concatenate([first_end, along_end], 1)
+        across = np.concatenate([across, across], 1)
+        flat = np.concatenate([horizontal, horizontal], 1)
+        present = lo <= hi
+        x0 = np.where(flat, lo, across)
+        x1 = np.where(flat, hi, across)
+        y0 = np.where(flat, across, lo)
+        y1 = np.where(flat, across, hi)
+        touch = (present[:, :, None] & present[:, None, :]
+                 & (x0[:, :, None] <= x1[:, None, :] + 1) & (x0[:, None, :] <= x1[:, :, None] + 1)
+                 & (y0[:, :, None] <= y1[:, None, :] + 1) & (y0[:, None, :] <= y1[:, :, None] + 1))
+        earlier = np.tril(np.ones(touch.shape[1:], dtype=bool), -1)
+        # Transitive closure by repeated squaring
+        reach = touch.astype(np.float32)
+        for _ in range(int(np.ceil(np.log2(max(2, touch.shape[1]))))):
+            reach = np.minimum(reach @ reach, 1)
+        # Count each component at its first piece
+        components = (present & ~((reach > 0) & earlier).any(2)).sum(1)
+        # A forest of P pieces in C trees has P - C contacts; more means a cycle
+        contacts = (touch & earlier).sum((1, 2))
+        return components, contacts > present.sum(1) - components
@@ -0,0 +1,59 @@
+# Frame time of the barrier pass against barrier count: direct line drawing
+# (the old Barrier.render) against blitting tiles from the barrier tile atlas,
+# as BarrierLayer does. Both draw the same pixels.
+#
+#   python benchmarks/bench_barrier_render.py
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pygame
+import snake_game
+from snake_game import (GRID_SIZE, GRID_WIDTH, GRID_HEIGHT, BarrierField, barrier_shine_position,
+                        barrier_tiles, draw_barrier_cell)
+
+FRAMES = 60
+BARRIER_COUNTS = [50, 100, 200, 400, 800]
+
+def make_barriers(count):
+    cells = [(x, y) for y in range(GRID_HEIGHT) for x in range(GRID_WIDTH)]
+    return BarrierField([cells[i * len(cells) // count] for i in range(count)])
+
+def render_direct(surface, barriers):
+    steps = barriers.steps
+    for (x, y), pattern_offset, shine_angle in zip(barriers.positions, barriers.pattern_offset.tolist(),
+                                                   barriers.shine_angle.tolist()):
+        draw_barrier_cell(surface, x * GRID_SIZE, y * GRID_SIZE,
+                          pattern_offset + steps, barrier_shine_position(shine_angle + 0.1 * steps))
+    barriers.animate()
+
+def render_atlas(surface, barriers):
+    barriers.render(surface)
+    barriers.animate()
+
+def time_frames(render, surface, barriers):
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        surface.fill(snake_game.BLACK)
+        render(surface, barriers)
+    return (time.perf_counter() - start) / FRAMES * 1000
+
+def main():
+    pygame.display.init()
+    screen = pygame.display.set_mode((snake_game.WINDOW_WIDTH, snake_game.WINDOW_HEIGHT))
+    surface = pygame.Surface(screen.get_size()).convert()
+    barrier_tiles.prerender()
+
+    print(f"{'barriers':>8} {'direct ms':>10} {'atlas ms':>10}")
+    for count in BARRIER_COUNTS:
+        barriers = make_barriers(count)
+        direct = time_frames(render_direct, surface, barriers)
+        atlas = time_frames(render_atlas, surface, barriers)
+        print(f"{count:>8} {direct:>10.3f} {atlas:>10.3f}")
+    pygame.quit()
+
+if __name__ == '__main__':
+    main()
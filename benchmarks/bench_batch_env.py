@@ -0,0 +1,33 @@
+# BatchSnakeEnv throughput for different numbers of parallel games, with
+# random actions. "game steps/sec" counts one move of one game.
+#
+#   python benchmarks/bench_batch_env.py
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from batch_env import BatchSnakeEnv
+
+NUM_ENVS = [1, 16, 256, 1024, 4096, 16384]
+SECONDS = 1.0
+
+def main():
+    print(f"{'games':>7} {'steps/sec':>11} {'game steps/sec':>15}")
+    for n in NUM_ENVS:
+        env = BatchSnakeEnv(n, seed=0)
+        rng = np.random.default_rng(0)
+        actions = np.where(rng.random((64, n)) < 0.1, rng.integers(0, 4, (64, n)), -1)
+        steps = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < SECONDS:
+            env.step(actions[steps & 63])
+            steps += 1
+        elapsed = time.perf_counter() - start
+        print(f"{n:>7} {steps / elapsed:>11,.0f} {steps * n / elapsed:>15,.0f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# Frame time of a representative PLAYING scene in FULL_FRAME versus
+# DIRTY_RECTS render mode (compose + present), plus a static menu scene.
+#
+#   python benchmarks/bench_display_update.py
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pygame
+import snake_game
+from snake_game import (DIRTY_RECTS, FULL_FRAME, WHITE, BarrierLayer, BonusFood, Food,
+                        FramePresenter, Menu, Snake, barrier_tiles, create_barriers,
+                        text_cache)
+
+FRAMES = 300
+TICK_FRAMES = round(snake_game.LOGIC_TICK_MS / (1000 / 60))
+
+def time_playing(mode, screen, surface, menu):
+    random.seed(1)
+    presenter = FramePresenter(mode)
+    snake = Snake()
+    food = Food()
+    bonus_food = BonusFood()
+    barriers = create_barriers(5)
+    layer = BarrierLayer(barriers)
+    food.randomize_position(barriers, snake.positions)
+    start = time.perf_counter()
+    for frame in range(FRAMES):
+        # One logic tick every TICK_FRAMES rendered frames, as at 60 fps
+        if frame % TICK_FRAMES == 0 and not snake.update(barriers):
+            snake.reset()
+        barriers.animate()
+        presenter.mark(layer.render(surface))
+        presenter.mark(snake.render(surface, (frame % TICK_FRAMES + 1) / TICK_FRAMES))
+        presenter.mark(food.render(surface))
+        presenter.mark(bonus_food.render(surface))
+        presenter.mark(surface.blit(text_cache.render(menu.small_font, f'Score: {snake.score}', WHITE), (10, 10)))
+        presenter.present(screen, surface)
+    return (time.perf_counter() - start) / FRAMES * 1000
+
+def time_menu(mode, screen, surface, menu):
+    presenter = FramePresenter(mode)
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        presenter.mark(menu.render(surface))
+        presenter.present(screen, surface)
+    return (time.perf_counter() - start) / FRAMES * 1000
+
+def main():
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((snake_game.WINDOW_WIDTH, snake_game.WINDOW_HEIGHT))
+    surface = pygame.Surface(screen.get_size()).convert()
+    barrier_tiles.prerender()
+    menu = Menu()
+
+    print(f"{'scene':>8} {'full ms':>9} {'dirty ms':>9}")
+    for name, run in (("playing", time_playing), ("menu", time_menu)):
+        full = run(FULL_FRAME, screen, surface, menu)
+        dirty = run(DIRTY_RECTS, screen, surface, menu)
+        print(f"{name:>8} {full:>9.3f} {dirty:>9.3f}")
+    pygame.quit()
+
+if __name__ == '__main__':
+    main()
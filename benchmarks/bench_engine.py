@@ -0,0 +1,32 @@
+# Headless GameEngine throughput: ticks per second with a random-turn policy,
+# starting a new game whenever one ends. No pygame import, no display.
+#
+#   python benchmarks/bench_engine.py
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from snake_engine import DOWN, LEFT, RIGHT, UP, GameEngine
+
+TICKS = 300000
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+
+def main():
+    rng = random.Random(0)
+    turns = [rng.choice(DIRECTIONS) if rng.random() < 0.1 else None for _ in range(4096)]
+    engine = GameEngine(seed=0)
+    games = 1
+    start = time.perf_counter()
+    for tick in range(TICKS):
+        if not engine.step(turns[tick & 4095]):
+            engine.reset(seed=games)
+            games += 1
+    elapsed = time.perf_counter() - start
+    print(f"{TICKS} ticks, {games} games: {TICKS / elapsed:,.0f} ticks/sec")
+    print("pygame imported:", "pygame" in sys.modules)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Multiplayer load test: starts snake_server.py and bot processes on
+# localhost, lets them play for a while and reports the server's per-tick
+# work time (simulate, encode and write to every client), how late ticks
+# started, and the size of the per-tick delta, for each bot count. The
+# server is one process, so it gets one core; the bots are spread over
+# other processes.
+#
+#   python benchmarks/bench_multiplayer.py
+#   python benchmarks/bench_multiplayer.py --bots 100,200 --duration 30 --bot-processes 4
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from snake_engine import MOVE_INTERVAL_MS
+
+CONNECT_TIMEOUT = 30  # Seconds to wait for the server to listen
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_for_server(port, process):
+    # Each probe joins as a client that leaves again straight away
+    deadline = time.monotonic() + CONNECT_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited before listening")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("server didn't start listening")
+
+def run_load(bots, duration, tick_ms, bot_processes, seed):
+    # Server stats (see SnakeServer.stats) after `duration` seconds with `bots` bots
+    port = free_port()
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy")
+    # One extra second for the bots to connect
+    server = subprocess.Popen(
+        [sys.executable, "snake_server.py", "--port", str(port), "--seed", str(seed),
+         "--tick-ms", str(tick_ms), "--duration", str(duration + 1)],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        wait_for_server(port, server)
+        processes = min(bot_processes, bots)
+        clients = []
+        for i in range(processes):
+            count = bots // processes + (i < bots % processes)
+            clients.append(subprocess.Popen(
+                [sys.executable, "snake_bot.py", "--port", str(port), "--bots", str(count),
+                 "--seed", str(seed * 1000 + i * count)],
+                cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        out, _ = server.communicate(timeout=duration + CONNECT_TIMEOUT)
+        for client in clients:
+            client.wait(timeout=CONNECT_TIMEOUT)
+    finally:
+        if server.poll() is None:
+            server.kill()
+    return json.loads(out.strip().splitlines()[-1])
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Snake multiplayer load test")
+    parser.add_argument("--bots", default="10,100,200",
+                        help="comma separated bot counts, one run each")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per run")
+    parser.add_argument("--tick-ms", type=float, default=MOVE_INTERVAL_MS)
+    parser.add_argument("--bot-processes", type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help="processes to spread the bots over")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(f"tick {args.tick_ms:.1f} ms, {args.bot_processes} bot process(es)")
+    print(f"{'bots':>5} {'peak':>5} {'ticks':>6} {'work p50':>9} {'p99':>7} {'max':>7} "
+          f"{'late p99':>9} {'max':>7} {'bytes/tick':>11} {'dropped':>8}")
+    for bots in (int(n) for n in args.bots.split(",")):
+        stats = run_load(bots, args.duration, args.tick_ms, args.bot_processes, args.seed)
+        print(f"{bots:>5} {stats['peak_clients']:>5} {stats['ticks']:>6} {stats['work_p50']:>9.2f} "
+              f"{stats['work_p99']:>7.2f} {stats['work_max']:>7.2f} {stats['late_p99']:>9.2f} "
+              f"{stats['late_max']:>7.2f} {stats['bytes_per_tick']:>11.0f} {stats['dropped']:>8}")
+
+if __name__ == '__main__':
+    main()
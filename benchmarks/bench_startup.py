@@ -0,0 +1,73 @@
+# Startup time, each run in a fresh interpreter: cold `import snake_game`,
+# time to the first menu frame on screen, and time to playable (Enter is
+# pressed on the first menu frame; playable is the first game frame on
+# screen). Times are from the start of the child script, best and median
+# of RUNS. Children run in a scratch directory so the history files the
+# menu creates don't land in the checkout.
+#
+#   python benchmarks/bench_startup.py
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+RUNS = 10
+
+# Runs in the child; argv[1] is what to measure. Prints milliseconds.
+CHILD = r"""
+import sys, time
+start = time.perf_counter()
+import snake_game
+if sys.argv[1] == "import":
+    print((time.perf_counter() - start) * 1000)
+    sys.exit()
+import pygame
+
+state = {"frames": 0, "in_game": False}
+present = snake_game.FramePresenter.present
+render_snake = snake_game.Snake.render
+
+def timed_present(self, screen, surface):
+    present(self, screen, surface)
+    state["frames"] += 1
+    if sys.argv[1] == "first_frame" or state["in_game"]:
+        print((time.perf_counter() - start) * 1000)
+        sys.stdout.flush()
+        pygame.quit()
+        sys.exit()
+    # Start a game as soon as the menu shows
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN, mod=0, unicode="\r"))
+
+def marked_render(self, *args, **kwargs):
+    state["in_game"] = True
+    return render_snake(self, *args, **kwargs)
+
+snake_game.FramePresenter.present = timed_present
+snake_game.Snake.render = marked_render
+snake_game.main(fps=0)
+"""
+
+MEASURES = [
+    ("import", "cold import"),
+    ("first_frame", "first menu frame"),
+    ("playable", "time to playable"),
+]
+
+def run_child(measure, cwd):
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy",
+               PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    out = subprocess.run([sys.executable, "-c", CHILD, measure], cwd=cwd, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return float(out.split()[-1])
+
+def main():
+    print(f"{'phase':<18} {'best ms':>9} {'median ms':>10}")
+    with tempfile.TemporaryDirectory() as scratch:
+        for measure, label in MEASURES:
+            times = [run_child(measure, scratch) for _ in range(RUNS)]
+            print(f"{label:<18} {min(times):>9.1f} {statistics.median(times):>10.1f}")
+
+if __name__ == '__main__':
+    main()
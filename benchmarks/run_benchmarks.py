@@ -0,0 +1,367 @@
+# Hot-path benchmark suite with regression tracking. Times BarrierField.render
+# and animate, Snake.render and Snake.update at snake lengths 3 to 1000,
+# Food.randomize_position on nearly full boards, create_barriers at levels 1
+# to 50, autopilot planning and whole frames of representative scenes,
+# headless with the SDL dummy video driver. The suite runs in PROCESSES
+# fresh interpreters, ROUNDS rounds each, and a round times every metric
+# once, so a burst of load on the machine hits one sample of many metrics
+# rather than every sample of one.
+# Results (milliseconds per call: the median and the fastest of the rounds,
+# with how much the rounds spread) go to a JSON file and are compared
+# against a stored baseline. Load on the machine only ever adds time, so
+# the fastest rounds are what gets compared: the exit status is 1 when any
+# metric's fastest round got slower than the baseline's by more than
+# --threshold (and by more than NOISE_FLOOR, for a --threshold below it).
+#
+#   python benchmarks/run_benchmarks.py --update-baseline   # record baseline.json
+#   python benchmarks/run_benchmarks.py                     # compare against it
+#
+# Baselines only mean something on the machine that recorded them.
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from functools import partial
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pygame
+import snake_game
+from autopilot import Autopilot
+from snake_game import (FULL_FRAME, GRID_HEIGHT, GRID_WIDTH, WHITE, BarrierField, BarrierLayer,
+                        BonusFood, Camera, Food, FramePresenter, GameSession, Menu, Snake,
+                        barrier_tiles, create_barriers, make_barrier_layer, text_cache)
+from snake_engine import OccupancyGrid
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+DEFAULT_THRESHOLD = 0.25  # Allowed slowdown, as a fraction of the baseline
+
+ROUNDS = 5  # Per process
+PROCESSES = 3
+MIN_RUN_TIME = 0.1  # Seconds; calls per sample are doubled until one lasts this long
+NOISE_FLOOR = 0.03  # Slowdowns under this fraction of the baseline never count as regressions
+SNAKE_LENGTHS = [3, 10, 100, 1000]
+BARRIER_LEVELS = [1, 10, 25, 50]
+FREE_CELLS = [1, 5, 50]  # Cells left open for Food.randomize_position
+AUTOPILOT_LENGTHS = [3, 100, 500, 1000]
+FRAME_LEVELS = [1, 10]
+FRAME_WORLDS = [(200, 150), (1000, 1000)]  # Scrolling boards, in cells
+SCROLL_PER_FRAME = 1 / 11  # Cells the view moves per world frame, the snake's pace at 60 fps
+
+def time_calls(fn, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    return time.perf_counter() - start
+
+def measure(suite):
+    # {name: [milliseconds per call, one per round]} for a list of (name, fn).
+    # Garbage collection is off while timing, as in timeit.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        numbers = []
+        for name, fn in suite:
+            number = 1
+            while time_calls(fn, number) < MIN_RUN_TIME:
+                number *= 2
+            numbers.append(number)
+        samples = [[] for _ in suite]
+        for _ in range(ROUNDS):
+            for (name, fn), number, times in zip(suite, numbers, samples):
+                times.append(time_calls(fn, number) / number * 1000)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return {name: times for (name, fn), times in zip(suite, samples)}
+
+def summarize(samples):
+    # {name: (milliseconds per call, fastest, noise)}: the median and the
+    # minimum of each metric's samples, and the spread between the second
+    # fastest and second slowest sample as a fraction of the median
+    results = {}
+    for name, times in samples.items():
+        times = sorted(times)
+        median = times[len(times) // 2]
+        results[name] = (median, times[0], (times[-2] - times[1]) / median if median else 0.0)
+    return results
+
+def board_cycle():
+    # A closed path through every cell: rows back and forth from column 1,
+    # then up column 0 to the start. A snake following it never hits itself.
+    cycle = []
+    for y in range(GRID_HEIGHT):
+        xs = range(1, GRID_WIDTH) if y % 2 == 0 else range(GRID_WIDTH - 1, 0, -1)
+        cycle.extend((x, y) for x in xs)
+    cycle.extend((0, y) for y in range(GRID_HEIGHT - 1, -1, -1))
+    return cycle
+
+class CycleSnake:
+    # A Snake of a given length laid along board_cycle(), steered so it keeps
+    # following the cycle
+    def __init__(self, length, grid=None):
+        self.cycle = board_cycle()
+        self.snake = snake = Snake(grid if grid is not None else OccupancyGrid())
+        for p in snake.positions:
+            snake.grid.remove_snake(p)
+        self.head = length - 1
+        snake.positions.clear()
+        snake.positions.extend(self.cycle[self.head - i] for i in range(length))
+        for p in snake.positions:
+            snake.grid.add_snake(p)
+        snake.length = length
+        self.steer()
+
+    def steer(self):
+        here = self.cycle[self.head]
+        there = self.cycle[(self.head + 1) % len(self.cycle)]
+        self.snake.direction = (there[0] - here[0], there[1] - here[1])
+
+    def update(self, barriers):
+        alive = self.snake.update(barriers)
+        self.head = (self.head + 1) % len(self.cycle)
+        self.steer()
+        return alive
+
+# Each bench_* adds (name, fn) pairs to the suite; fn is called with no
+# arguments and everything it needs is built up front, outside the timing.
+# Renders get objects of their own that nothing moves, so every run draws
+# the same scene however many calls the timed moves made.
+
+def bench_barrier_render(surface, suite):
+    for level in BARRIER_LEVELS:
+        barriers = create_barriers(level, random.Random(level))
+        suite.append((f"barrier_render/level={level}", partial(barriers.render, surface)))
+        animated = create_barriers(level, random.Random(level))
+        suite.append((f"barrier_animate/level={level}", animated.animate))
+
+def bench_snake(surface, suite):
+    for length in SNAKE_LENGTHS:
+        runner = CycleSnake(length)
+        suite.append((f"snake_update/length={length}", partial(runner.update, BarrierField([]))))
+        still = CycleSnake(length).snake
+        suite.append((f"snake_render/length={length}", partial(still.render, surface, 0.5)))
+
+def bench_food(suite):
+    cells = GRID_WIDTH * GRID_HEIGHT
+    for free in FREE_CELLS:
+        grid = OccupancyGrid()
+        snake = CycleSnake(cells - free, grid).snake
+        food = Food(grid, random.Random(free))
+        suite.append((f"food_randomize/free={free}",
+                      partial(food.randomize_position, BarrierField([]), snake.positions)))
+
+def fresh_plan(snake, food):
+    return Autopilot().choose(snake.grid, snake.positions, food, snake.length)
+
+def bench_autopilot(suite):
+    # A full plan from scratch, the worst case for one tick: the first move
+    # of a fresh Autopilot, food on the far side of the body
+    for length in AUTOPILOT_LENGTHS:
+        snake = CycleSnake(length).snake
+        head = snake.positions[0]
+        food = ((head[0] + GRID_WIDTH // 2) % GRID_WIDTH, (head[1] + GRID_HEIGHT // 2) % GRID_HEIGHT)
+        if snake.grid.snake_count(food):
+            food = next(p for p in board_cycle() if not snake.grid.snake_count(p))
+        suite.append((f"autopilot_plan/length={length}", partial(fresh_plan, snake, food)))
+
+def build_level(level):
+    # Same seed every call, so every run builds the same walls
+    return create_barriers(level, random.Random(level))
+
+def bench_create_barriers(suite):
+    for level in BARRIER_LEVELS:
+        suite.append((f"create_barriers/level={level}", partial(build_level, level)))
+
+def playing_frame(screen, surface, menu, presenter, level):
+    # Compose + present, as main() does in FULL_FRAME mode
+    rng = random.Random(level)
+    runner = CycleSnake(10 * level)
+    grid = runner.snake.grid
+    barriers = create_barriers(level, rng)
+    # Keep the walls off the snake's path
+    barriers = BarrierField([p for p in barriers.positions if not grid.snake_count(p)], rng)
+    layer = BarrierLayer(barriers)
+    food = Food(grid, rng)
+    food.randomize_position(barriers, runner.snake.positions)
+    bonus_food = BonusFood(grid, clock=lambda: 0, rng=rng)
+    def frame():
+        barriers.animate()  # One step per frame, as at 60 fps
+        presenter.mark(layer.render(surface))
+        presenter.mark(runner.snake.render(surface, 0.5))
+        presenter.mark(food.render(surface))
+        presenter.mark(bonus_food.render(surface))
+        presenter.mark(surface.blit(
+            text_cache.render(menu.small_font, f'Score: {runner.snake.score}', WHITE), (10, 10)))
+        presenter.mark(surface.blit(
+            text_cache.render(menu.small_font, f'Level: {level}', WHITE), (10, 50)))
+        presenter.present(screen, surface)
+    return frame
+
+def world_frame(screen, surface, presenter, width, height):
+    # Large worlds: frame cost should track the window, not the board. The
+    # game is built here, outside the timing; the view then scrolls on along
+    # a diagonal at the snake's pace, without playing, so no frame pays for
+    # building a new game or level.
+    session = GameSession(1, width, height)
+    layer = make_barrier_layer(session.barriers, width, height)
+    camera = Camera(surface.get_size())
+    head = session.snake.positions[0]
+    view = {"frames": 0}
+    def frame():
+        view["frames"] += 1
+        moved = view["frames"] * SCROLL_PER_FRAME
+        cell = ((head[0] + moved) % width, (head[1] + moved) % height)
+        offset = camera.follow(cell, (width, height))
+        session.barriers.animate()
+        presenter.mark(layer.render(surface, offset))
+        presenter.mark(session.snake.render(surface, 0.5, offset))
+        presenter.mark(session.food.render(surface, offset))
+        presenter.mark(session.bonus_food.render(surface, offset))
+        presenter.present(screen, surface)
+    return frame
+
+def bench_frames(screen, surface, menu, suite):
+    presenter = FramePresenter(FULL_FRAME)
+    for level in FRAME_LEVELS:
+        suite.append((f"frame/playing_level={level}",
+                      playing_frame(screen, surface, menu, presenter, level)))
+    for width, height in FRAME_WORLDS:
+        suite.append((f"frame/world={width}x{height}",
+                      world_frame(screen, surface, presenter, width, height)))
+
+    def menu_frame():
+        presenter.mark(menu.render(surface))
+        presenter.present(screen, surface)
+    suite.append(("frame/menu", menu_frame))
+
+def run():
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((snake_game.WINDOW_WIDTH, snake_game.WINDOW_HEIGHT))
+    surface = pygame.Surface(screen.get_size()).convert()
+    barrier_tiles.prerender()
+    menu = Menu()
+
+    suite = []
+    bench_barrier_render(surface, suite)
+    bench_snake(surface, suite)
+    bench_food(suite)
+    bench_autopilot(suite)
+    bench_create_barriers(suite)
+    bench_frames(screen, surface, menu, suite)
+    samples = measure(suite)
+    pygame.quit()
+    return samples
+
+def run_processes(count):
+    # run()'s samples from `count` fresh interpreters, pooled. Where a
+    # process's code and data land in memory moves the microsecond metrics
+    # by up to half from one process to the next, far more than rounds
+    # within a process vary, so the fastest round only settles across several.
+    samples = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        path = os.path.join(scratch, "samples.json")
+        for _ in range(count):
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--samples-to", path],
+                           check=True)
+            with open(path) as f:
+                for name, times in json.load(f).items():
+                    samples.setdefault(name, []).extend(times)
+    return samples
+
+def compare(results, baseline, threshold):
+    # Prints every metric against the baseline ({name: (ms, fastest, noise)});
+    # returns the regressed names. The fastest rounds are compared, and
+    # `threshold` is the whole allowance; the noise is shown, not added.
+    regressed = []
+    allowed = max(threshold, NOISE_FLOOR)
+    print(f"{'metric':<32} {'fastest':>10} {'baseline':>10} {'change':>8} {'noise':>7}")
+    for name, (ms, best, noise) in results.items():
+        if name not in baseline:
+            print(f"{name:<32} {best:>10.4f} {'-':>10} {'new':>8}")
+            continue
+        base = baseline[name][1]
+        change = best / base - 1 if base else 0.0
+        flag = ""
+        if change > allowed:
+            regressed.append(name)
+            flag = "  REGRESSED"
+        print(f"{name:<32} {best:>10.4f} {base:>10.4f} {change:>+8.1%} {noise:>7.1%}{flag}")
+    return regressed
+
+def load_results(path):
+    # {name: (ms, fastest, noise)}; files from before the fastest round was
+    # recorded use the median for it, and count as noiseless if older still
+    with open(path) as f:
+        data = json.load(f)
+    best = data.get("best", {})
+    noise = data.get("noise", {})
+    return {name: (ms, best.get(name, ms), noise.get(name, 0.0))
+            for name, ms in data["metrics"].items()}
+
+def write_json(path, results):
+    data = {
+        "time": round(time.time(), 3),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "machine": platform.machine(),
+        "metrics": {name: ms for name, (ms, best, noise) in results.items()},
+        "best": {name: best for name, (ms, best, noise) in results.items()},
+        "noise": {name: round(noise, 4) for name, (ms, best, noise) in results.items()},
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Snake hot-path benchmarks")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, metavar="PATH",
+                        help="where to write this run's results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, metavar="PATH",
+                        help="results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="fail when a metric's fastest round is this much slower than the "
+                             "baseline's (0.25 = 25%%)")
+    parser.add_argument("--processes", type=int, default=PROCESSES,
+                        help="fresh interpreters to run the suite in (default %(default)s)")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store this run as the baseline instead of comparing")
+    # Set by run_processes() for its children
+    parser.add_argument("--samples-to", metavar="PATH", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.samples_to:
+        with open(args.samples_to, "w") as f:
+            json.dump(run(), f)
+        return 0
+    results = summarize(run_processes(args.processes))
+    write_json(args.output, results)
+    if args.update_baseline:
+        write_json(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    try:
+        baseline = load_results(args.baseline)
+    except FileNotFoundError:
+        baseline = {}
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+    regressed = compare(results, baseline, args.threshold)
+    if regressed:
+        print(f"{len(regressed)} metric(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# Per-frame timing for the game loop, broken down by phase. The main loop
+# calls begin_frame(), mark(PHASE) after each phase and end_frame(); while
+# the profiler is off those calls return straight away.
+#
+# Frame time is the interval between frame starts (what the player sees,
+# including the clock.tick wait); work time is the part spent in the phases.
+# A frame counts as dropped when its interval exceeds DROPPED_FRAME_FACTOR
+# times the frame budget.
+import csv
+import json
+import time
+
+EVENTS = 0
+SNAKE_UPDATE = 1
+FOOD_BONUS = 2
+BARRIER_RENDER = 3
+SNAKE_RENDER = 4  # Snake, food and bonus food
+HUD_RENDER = 5  # Score/level text, menu and history screens
+DISPLAY_FLIP = 6
+PHASES = ("events", "snake_update", "food_bonus", "barrier_render",
+          "snake_render", "hud_render", "display_flip")
+
+DROPPED_FRAME_FACTOR = 1.5
+STATS_WINDOW = 600  # Frames kept for the percentiles
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+class FrameProfiler:
+    def __init__(self, budget_ms, trace_path=None):
+        self.budget_ms = budget_ms
+        self.show_overlay = False
+        self.enabled = False  # Recording: overlay shown or trace requested
+        self.frame = 0
+        self.frame_start = None
+        self.last = 0.0
+        self.phases = [0.0] * len(PHASES)
+        self.last_phases = self.phases
+        self.intervals = []  # ms, ring buffer of STATS_WINDOW frames
+        self.work = []
+        self.dropped = 0
+        self.trace_path = trace_path
+        self.trace_rows = []
+        if trace_path:
+            self.enabled = True
+
+    def toggle_overlay(self):
+        # A trace keeps recording while the overlay is hidden
+        self.show_overlay = not self.show_overlay
+        self.enabled = self.show_overlay or bool(self.trace_path)
+        self.frame_start = None
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self._record((now - self.frame_start) * 1000)
+        self.frame_start = self.last = now
+        self.phases = [0.0] * len(PHASES)
+
+    def mark(self, phase):
+        # Charge the time since the previous mark to `phase`
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases[phase] += (now - self.last) * 1000
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.last = time.perf_counter()
+
+    def _record(self, interval):
+        work = sum(self.phases)
+        self.last_phases = self.phases
+        slot = self.frame % STATS_WINDOW
+        if len(self.intervals) < STATS_WINDOW:
+            self.intervals.append(interval)
+            self.work.append(work)
+        else:
+            self.intervals[slot] = interval
+            self.work[slot] = work
+        if interval > self.budget_ms * DROPPED_FRAME_FACTOR:
+            self.dropped += 1
+        if self.trace_path:
+            self.trace_rows.append([self.frame, round(interval, 4), round(work, 4)]
+                                   + [round(t, 4) for t in self.phases])
+        self.frame += 1
+
+    def stats(self):
+        intervals = sorted(self.intervals)
+        work = sorted(self.work)
+        mean = sum(intervals) / len(intervals) if intervals else 0.0
+        return {
+            "fps": 1000 / mean if mean else 0.0,
+            "frame_p50": percentile(intervals, 0.50),
+            "frame_p99": percentile(intervals, 0.99),
+            "work_p50": percentile(work, 0.50),
+            "work_p99": percentile(work, 0.99),
+            "dropped": self.dropped,
+            "phases": dict(zip(PHASES, self.last_phases)),
+        }
+
+    def write_trace(self):
+        # CSV unless the path ends in .json
+        if not self.trace_path:
+            return
+        columns = ["frame", "frame_ms", "work_ms"] + [f"{p}_ms" for p in PHASES]
+        with open(self.trace_path, "w", newline="") as f:
+            if self.trace_path.endswith(".json"):
+                json.dump([dict(zip(columns, row)) for row in self.trace_rows], f)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(self.trace_rows)
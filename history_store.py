@@ -0,0 +1,212 @@
+# Game history: an append-only JSON-lines log with one record per finished
+# game, plus a small index file with the summary the menu shows (count,
+# averages, top scores, latest games). The index has a fixed size, so opening
+# the history costs the same however many games the log holds.
+#
+# Crash safety: each record is a single write of one line, fsynced; the index
+# is written to a temporary file and swapped in with os.replace. The index
+# remembers how many log bytes it covers, so records appended after the last
+# index write are replayed from the log tail on load, and a torn last line
+# (crash mid-write) is cut off.
+#
+# append() updates the in-memory summary straight away; with a
+# BackgroundWriter the disk writes happen later on its thread, batched
+# through write_batch(). The log is always written before the index.
+import json
+import os
+import re
+import time
+
+LOG_FILE = "snake_history.jsonl"
+INDEX_FILE = "snake_history_index.json"
+LEGACY_FILE = "snake_history.txt"  # Old "Score: X | Level: Y | Time: Zs" lines
+INDEX_VERSION = 1
+
+TOP_SIZE = 10  # Best games kept in the index
+RECENT_SIZE = 10  # Latest games kept in the index
+
+LEGACY_LINE = re.compile(r"Score: (\d+) \| Level: (\d+)")
+
+def empty_summary():
+    return {
+        "version": INDEX_VERSION,
+        "log_size": 0,  # Bytes of the log covered by this summary
+        "count": 0,
+        "total_score": 0,
+        "total_length": 0,
+        "total_duration": 0.0,
+        "best_level": 0,
+        "top": [],  # Highest scores first
+        "recent": [],  # Newest first
+    }
+
+def make_entry(score, level, length=None, duration=None, seed=None, cause=None, ticks=None,
+               timestamp=None):
+    # One history record; `timestamp` is Unix time, `duration` seconds of play
+    return {
+        "time": round(time.time() if timestamp is None else timestamp, 3),
+        "seed": seed,
+        "score": score,
+        "level": level,
+        "length": length,
+        "duration": None if duration is None else round(duration, 3),
+        "ticks": ticks,
+        "cause": cause,
+    }
+
+class HistoryStore:
+    def __init__(self, directory="."):
+        self.log_path = os.path.join(directory, LOG_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.legacy_path = os.path.join(directory, LEGACY_FILE)
+        self.summary = empty_summary()
+
+    def load(self):
+        # Index first; the log is only read past the bytes the index covers
+        summary = self._read_index()
+        try:
+            log_size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            log_size = None
+
+        if log_size is None:
+            self.summary = empty_summary()
+            self._migrate_legacy()
+            return self
+        if summary is None or summary["log_size"] > log_size:
+            # Index missing, damaged or ahead of the log: rebuild from scratch
+            summary = empty_summary()
+        self.summary = summary
+        if log_size > summary["log_size"]:
+            self._replay_tail()
+            self._write_index(json.dumps(self.summary, separators=(",", ":")))
+        return self
+
+    def append(self, entry, writer=None):
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode()
+        self._add(entry, len(line))
+        # Snapshot the index now; the writer thread must not read the live summary
+        record = (line, json.dumps(self.summary, separators=(",", ":")))
+        if writer is None:
+            self.write_batch([record])
+        else:
+            writer.submit(self, record)
+
+    def write_batch(self, records, fsync=True):
+        # (log line, index snapshot) pairs in append order: one log write,
+        # then the newest index
+        with open(self.log_path, "ab") as f:
+            f.write(b"".join(line for line, _ in records))
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        self._write_index(records[-1][1], fsync)
+
+    def sync(self):
+        for path in (self.log_path, self.index_path):
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def count(self):
+        return self.summary["count"]
+
+    def top(self, n=TOP_SIZE):
+        return self.summary["top"][:n]
+
+    def recent(self, n=RECENT_SIZE):
+        return self.summary["recent"][:n]
+
+    def averages(self):
+        count = self.summary["count"]
+        if not count:
+            return {"score": 0.0, "length": 0.0, "duration": 0.0}
+        return {
+            "score": self.summary["total_score"] / count,
+            "length": self.summary["total_length"] / count,
+            "duration": self.summary["total_duration"] / count,
+        }
+
+    def entries(self):
+        # Every record in the log, oldest first (reads the whole file)
+        try:
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    if line.endswith(b"\n"):
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
+
+    def _add(self, entry, size):
+        s = self.summary
+        s["log_size"] += size
+        s["count"] += 1
+        s["total_score"] += entry["score"]
+        s["total_length"] += entry["length"] or 0
+        s["total_duration"] += entry["duration"] or 0.0
+        s["best_level"] = max(s["best_level"], entry["level"])
+        s["recent"].insert(0, entry)
+        del s["recent"][RECENT_SIZE:]
+        # Ties keep the earlier game ahead
+        top = s["top"]
+        i = len(top)
+        while i and top[i - 1]["score"] < entry["score"]:
+            i -= 1
+        if i < TOP_SIZE:
+            top.insert(i, entry)
+            del top[TOP_SIZE:]
+
+    def _replay_tail(self):
+        with open(self.log_path, "rb+") as f:
+            f.seek(self.summary["log_size"])
+            tail = f.read()
+            end = tail.rfind(b"\n") + 1
+            if end < len(tail):
+                # Torn record from an interrupted write
+                f.truncate(self.summary["log_size"] + end)
+        for line in tail[:end].splitlines(keepends=True):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                self.summary["log_size"] += len(line)  # Skip unreadable line
+                continue
+            self._add(entry, len(line))
+
+    def _read_index(self):
+        try:
+            with open(self.index_path) as f:
+                summary = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not isinstance(summary, dict) or summary.get("version") != INDEX_VERSION:
+            return None
+        return summary
+
+    def _write_index(self, data, fsync=True):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def _migrate_legacy(self):
+        # Carry the old text history over once; it held newest first and no
+        # real timestamps. The old file is left in place.
+        try:
+            with open(self.legacy_path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        for line in reversed(lines):
+            match = LEGACY_LINE.search(line)
+            if match:
+                entry = make_entry(int(match.group(1)), int(match.group(2)))
+                entry["time"] = None
+                self.append(entry)
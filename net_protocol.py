@@ -0,0 +1,211 @@
+# Wire format of the multiplayer mode (snake_server.py, snake_bot.py).
+# Nothing here imports pygame.
+#
+# Client to server: one byte per turn, the direction's index in DIRECTIONS.
+# Server to client: messages framed by their length, all integers unsigned
+# LEB128 varints as in replays, each starting with its type:
+#   WELCOME  your player id, board width, height, tick, wall cells (count,
+#            then gaps between the sorted cells), snakes (count, then id,
+#            score, length and cells head first), items (count, then
+#            cell << 1 | is_bonus)
+#   TICK     tick, then sections, each a count and its entries:
+#              moves     id << 3 | grew << 2 | direction index; the head
+#                        moved one cell that way and the tail stayed put if
+#                        it grew
+#              removals  id (died or left)
+#              spawns    id, length, cells head first
+#              scores    id, score
+#              items gone, items added   cell << 1 | is_bonus
+# A cell is y * width + x. The server builds one TICK per tick and sends the
+# same bytes to every client; a moving snake costs a byte or two.
+from collections import deque
+
+from replay import DIRECTIONS, read_varint, write_varint
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5555
+
+WELCOME = 0
+TICK = 1
+
+DIRECTION_INDEX = {direction: i for i, direction in enumerate(DIRECTIONS)}
+
+def frame(payload):
+    out = bytearray()
+    write_varint(out, len(payload))
+    out += payload
+    return bytes(out)
+
+class FrameReader:
+    # Splits a byte stream back into messages
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data):
+        # Complete messages received so far; a partial one waits for more data
+        self.buffer += data
+        messages = []
+        pos = 0
+        while pos < len(self.buffer):
+            try:
+                size, start = read_varint(self.buffer, pos)
+            except ValueError:
+                break  # Length prefix cut short
+            if start + size > len(self.buffer):
+                break
+            messages.append(bytes(self.buffer[start:start + size]))
+            pos = start + size
+        del self.buffer[:pos]
+        return messages
+
+def write_cells(out, cells):
+    write_varint(out, len(cells))
+    for cell in cells:
+        write_varint(out, cell)
+
+def encode_welcome(player, width, height, tick, walls, snakes, items):
+    # `snakes`: (id, score, cells head first); `items`: cell << 1 | is_bonus
+    out = bytearray()
+    for value in (WELCOME, player, width, height, tick, len(walls)):
+        write_varint(out, value)
+    last = 0
+    for cell in sorted(walls):
+        write_varint(out, cell - last)
+        last = cell
+    write_varint(out, len(snakes))
+    for snake_id, score, cells in snakes:
+        write_varint(out, snake_id)
+        write_varint(out, score)
+        write_cells(out, cells)
+    write_cells(out, items)
+    return bytes(out)
+
+def encode_tick(tick, moves, removals, spawns, scores, items_gone, items_added):
+    # `moves`: (id, grew, direction index); `spawns`: (id, cells head first);
+    # `scores`: (id, score)
+    out = bytearray()
+    write_varint(out, TICK)
+    write_varint(out, tick)
+    write_varint(out, len(moves))
+    for snake_id, grew, direction in moves:
+        write_varint(out, snake_id << 3 | grew << 2 | direction)
+    write_cells(out, removals)
+    write_varint(out, len(spawns))
+    for snake_id, cells in spawns:
+        write_varint(out, snake_id)
+        write_cells(out, cells)
+    write_varint(out, len(scores))
+    for snake_id, score in scores:
+        write_varint(out, snake_id)
+        write_varint(out, score)
+    write_cells(out, items_gone)
+    write_cells(out, items_added)
+    return bytes(out)
+
+def read_cells(data, pos):
+    count, pos = read_varint(data, pos)
+    cells = []
+    for _ in range(count):
+        cell, pos = read_varint(data, pos)
+        cells.append(cell)
+    return cells, pos
+
+class ClientState:
+    # A client's copy of the world, kept up to date from the server's
+    # messages. `blocked` counts walls and snake segments per cell, so a bot
+    # can test a cell in constant time.
+    def __init__(self):
+        self.player = None
+        self.width = 0
+        self.height = 0
+        self.tick = 0
+        self.walls = set()
+        self.snakes = {}  # id -> deque of cells, head first
+        self.scores = {}
+        self.food = set()
+        self.bonus = set()
+        self.blocked = bytearray()
+
+    def apply(self, message):
+        kind, pos = read_varint(message, 0)
+        if kind == WELCOME:
+            self._welcome(message, pos)
+        elif kind == TICK:
+            self._tick(message, pos)
+        else:
+            raise ValueError(f"unknown message type {kind}")
+
+    def neighbour(self, cell, direction):
+        x = (cell % self.width + direction[0]) % self.width
+        y = (cell // self.width + direction[1]) % self.height
+        return y * self.width + x
+
+    def _welcome(self, data, pos):
+        self.player, pos = read_varint(data, pos)
+        self.width, pos = read_varint(data, pos)
+        self.height, pos = read_varint(data, pos)
+        self.tick, pos = read_varint(data, pos)
+        self.blocked = bytearray(self.width * self.height)
+        count, pos = read_varint(data, pos)
+        cell = 0
+        self.walls = set()
+        for _ in range(count):
+            gap, pos = read_varint(data, pos)
+            cell += gap
+            self.walls.add(cell)
+            self.blocked[cell] += 1
+        self.snakes = {}
+        self.scores = {}
+        count, pos = read_varint(data, pos)
+        for _ in range(count):
+            snake_id, pos = read_varint(data, pos)
+            self.scores[snake_id], pos = read_varint(data, pos)
+            cells, pos = read_cells(data, pos)
+            self._add_snake(snake_id, cells)
+        self.food = set()
+        self.bonus = set()
+        items, pos = read_cells(data, pos)
+        self._add_items(items)
+
+    def _tick(self, data, pos):
+        self.tick, pos = read_varint(data, pos)
+        blocked = self.blocked
+        count, pos = read_varint(data, pos)
+        for _ in range(count):
+            value, pos = read_varint(data, pos)
+            body = self.snakes[value >> 3]
+            head = self.neighbour(body[0], DIRECTIONS[value & 3])
+            body.appendleft(head)
+            blocked[head] += 1
+            if not value & 4:
+                blocked[body.pop()] -= 1
+        removals, pos = read_cells(data, pos)
+        for snake_id in removals:
+            # A snake that left just before we joined was never sent to us
+            for cell in self.snakes.pop(snake_id, ()):
+                blocked[cell] -= 1
+            self.scores.pop(snake_id, None)
+        count, pos = read_varint(data, pos)
+        for _ in range(count):
+            snake_id, pos = read_varint(data, pos)
+            cells, pos = read_cells(data, pos)
+            self._add_snake(snake_id, cells)
+            self.scores[snake_id] = 0
+        count, pos = read_varint(data, pos)
+        for _ in range(count):
+            snake_id, pos = read_varint(data, pos)
+            self.scores[snake_id], pos = read_varint(data, pos)
+        gone, pos = read_cells(data, pos)
+        for item in gone:
+            (self.bonus if item & 1 else self.food).discard(item >> 1)
+        added, pos = read_cells(data, pos)
+        self._add_items(added)
+
+    def _add_snake(self, snake_id, cells):
+        self.snakes[snake_id] = deque(cells)
+        for cell in cells:
+            self.blocked[cell] += 1
+
+    def _add_items(self, items):
+        for item in items:
+            (self.bonus if item & 1 else self.food).add(item >> 1)
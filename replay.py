@@ -0,0 +1,181 @@
+# Game replays: the seed plus the turns the player made, keyed by logic tick.
+# A game is deterministic given both (all its randomness comes from
+# generators seeded from it), so replaying the turns at the same ticks
+# rebuilds it exactly, without storing any frames.
+#
+# File format, all integers unsigned LEB128 varints:
+#   b"SNKR", version, seed, board width, board height, ticks played,
+#   number of turns, then per turn (ticks since the previous turn << 2 |
+#   direction index)
+# Versions 1 and 2 were recorded with the old level generator, and version 3
+# before food covered by a new level's walls was moved, so they can't be
+# reproduced any more.
+# A turn is applied just before the tick numbered `tick + 1` runs; a few bytes
+# per turn, a minute of play is typically well under 1 KB.
+import os
+from bisect import bisect_left
+from copy import deepcopy
+
+from snake_engine import GRID_WIDTH, GRID_HEIGHT, UP, DOWN, LEFT, RIGHT
+
+MAGIC = b"SNKR"
+VERSION = 4
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+
+REPLAY_DIR = "replays"
+REPLAY_SUFFIX = ".snkr"
+SNAPSHOT_INTERVAL = 100  # Ticks between the states kept for seeking
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("truncated replay")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+class Replay:
+    def __init__(self, seed, turns=None, ticks=0, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.seed = seed
+        self.turns = turns if turns is not None else []  # (tick, direction), in order
+        self.ticks = ticks  # Length of the game in ticks
+        self.width = width
+        self.height = height
+
+    def encode(self):
+        out = bytearray(MAGIC)
+        write_varint(out, VERSION)
+        write_varint(out, self.seed)
+        write_varint(out, self.width)
+        write_varint(out, self.height)
+        write_varint(out, self.ticks)
+        write_varint(out, len(self.turns))
+        last = 0
+        for tick, direction in self.turns:
+            write_varint(out, (tick - last) << 2 | DIRECTIONS.index(direction))
+            last = tick
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, data):
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError("not a replay file")
+        version, pos = read_varint(data, len(MAGIC))
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version {version}")
+        seed, pos = read_varint(data, pos)
+        width, pos = read_varint(data, pos)
+        height, pos = read_varint(data, pos)
+        ticks, pos = read_varint(data, pos)
+        count, pos = read_varint(data, pos)
+        turns = []
+        tick = 0
+        for _ in range(count):
+            value, pos = read_varint(data, pos)
+            tick += value >> 2
+            turns.append((tick, DIRECTIONS[value & 3]))
+        return cls(seed, turns, ticks, width, height)
+
+    def record(self, tick, direction):
+        # Called with the ticks played so far when a turn is queued
+        self.turns.append((tick, direction))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.decode(f.read())
+
+def replay_path(timestamp, seed, directory=REPLAY_DIR):
+    return os.path.join(directory, f"{int(timestamp)}-{seed}{REPLAY_SUFFIX}")
+
+class ReplayFiles:
+    # BackgroundWriter target; items are (path, encoded replay)
+    def __init__(self):
+        self.unsynced = []
+
+    def write_batch(self, items, fsync=True):
+        for path, data in items:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+                f.flush()
+                if fsync:
+                    os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            if not fsync:
+                self.unsynced.append(path)
+
+    def sync(self):
+        for path in self.unsynced:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                continue
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        self.unsynced = []
+
+class ReplayPlayer:
+    # Re-runs a replay on a fresh game session. `new_session(seed, width,
+    # height)` builds the session; it needs ticks, snake.queue_direction() and tick(). A deep copy
+    # of the session is kept every SNAPSHOT_INTERVAL ticks, so seek() only
+    # re-simulates from the nearest earlier snapshot. Snapshots of big boards
+    # are big, so by default they are spaced out in proportion to board area.
+    def __init__(self, replay, new_session, snapshot_interval=None):
+        self.replay = replay
+        if snapshot_interval is None:
+            scale = max(1, (replay.width * replay.height) // (GRID_WIDTH * GRID_HEIGHT))
+            snapshot_interval = SNAPSHOT_INTERVAL * scale
+        self.snapshot_interval = snapshot_interval
+        self.turn_ticks = [tick for tick, _ in replay.turns]
+        self.session = new_session(replay.seed, replay.width, replay.height)
+        self.alive = True
+        self.next_turn = 0
+        self.snapshots = {0: deepcopy(self.session)}
+
+    @property
+    def tick(self):
+        return self.session.ticks
+
+    @property
+    def finished(self):
+        return not self.alive or self.session.ticks >= self.replay.ticks
+
+    def step(self):
+        # One logic tick with the recorded turns; False once the game is over
+        if self.finished:
+            return False
+        session = self.session
+        turns = self.replay.turns
+        while self.next_turn < len(turns) and turns[self.next_turn][0] == session.ticks:
+            session.snake.queue_direction(turns[self.next_turn][1])
+            self.next_turn += 1
+        self.alive = session.tick()
+        if self.alive and session.ticks % self.snapshot_interval == 0:
+            self.snapshots.setdefault(session.ticks, deepcopy(session))
+        return self.alive
+
+    def seek(self, tick):
+        tick = max(0, min(tick, self.replay.ticks))
+        if tick < self.session.ticks or tick - self.session.ticks > self.snapshot_interval:
+            start = max(t for t in self.snapshots if t <= tick)
+            if start > self.session.ticks or tick < self.session.ticks:
+                self.session = deepcopy(self.snapshots[start])
+                self.alive = True
+                self.next_turn = bisect_left(self.turn_ticks, start)
+        while self.session.ticks < tick and self.step():
+            pass
@@ -0,0 +1,111 @@
+# Headless bot clients for the multiplayer server (snake_server.py). Each bot
+# keeps its own ClientState from the server's messages and answers every
+# tick: a safe move toward the nearest food, now and then a random safe one
+# so bots don't all crowd the same cells. Many bots share one process as
+# asyncio tasks.
+#
+#   python snake_bot.py --bots 100 --duration 60
+import argparse
+import asyncio
+import json
+import random
+import sys
+
+from net_protocol import DEFAULT_HOST, DEFAULT_PORT, DIRECTIONS, ClientState, FrameReader
+
+READ_SIZE = 65536
+WANDER_CHANCE = 0.05
+
+def torus_distance(state, a, b):
+    dx = abs(a % state.width - b % state.width)
+    dy = abs(a // state.width - b // state.width)
+    return min(dx, state.width - dx) + min(dy, state.height - dy)
+
+def choose(state, rng):
+    # Index of the direction to turn to, or None to keep going
+    body = state.snakes.get(state.player)
+    if body is None or len(body) < 2:
+        return None
+    head = body[0]
+    current = next(i for i, d in enumerate(DIRECTIONS) if state.neighbour(body[1], d) == head)
+    safe = []
+    for i, direction in enumerate(DIRECTIONS):
+        cell = state.neighbour(head, direction)
+        # Turning straight back is ignored by the server
+        if cell != body[1] and not state.blocked[cell]:
+            safe.append((i, cell))
+    if not safe:
+        return None
+    if rng.random() < WANDER_CHANCE:
+        choice = rng.choice(safe)[0]
+    else:
+        targets = state.food | state.bonus
+        if not targets:
+            return None
+        target = min(targets, key=lambda cell: torus_distance(state, head, cell))
+        choice = min(safe, key=lambda move: torus_distance(state, move[1], target))[0]
+    return choice if choice != current else None
+
+class Bot:
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.state = ClientState()
+        self.messages = 0
+        self.best_score = 0
+
+    async def run(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        reader, writer = await asyncio.open_connection(host, port)
+        frames = FrameReader()
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                for message in frames.feed(data):
+                    self.state.apply(message)
+                    self.messages += 1
+                score = self.state.scores.get(self.state.player, 0)
+                self.best_score = max(self.best_score, score)
+                direction = choose(self.state, self.rng)
+                if direction is not None:
+                    writer.write(bytes([direction]))
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+async def run_bots(count, host=DEFAULT_HOST, port=DEFAULT_PORT, duration=None, seed=0):
+    # Runs `count` bots until the server closes or `duration` seconds pass
+    bots = [Bot(seed + i) for i in range(count)]
+    tasks = [asyncio.create_task(bot.run(host, port)) for bot in bots]
+    done, pending = await asyncio.wait(tasks, timeout=duration)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for task in done:
+        if task.exception() is not None and not isinstance(task.exception(), ConnectionError):
+            raise task.exception()
+    return bots
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Snake multiplayer bots")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--bots", type=int, default=100, help="bots to run in this process")
+    parser.add_argument("--seed", type=int, default=0, help="first bot's seed")
+    parser.add_argument("--duration", type=float, metavar="SECONDS",
+                        help="disconnect after this long (default: until the server closes)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    bots = asyncio.run(run_bots(args.bots, args.host, args.port, args.duration, args.seed))
+    print(json.dumps({
+        "bots": len(bots),
+        "messages": sum(bot.messages for bot in bots),
+        "best_score": max((bot.best_score for bot in bots), default=0),
+    }))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,627 @@
+# Game rules shared by the pygame front end, the multiplayer server and
+# headless runs: the board (OccupancyGrid), level walls, the Snake, Food and
+# BonusFood rules and GameEngine, the single-player game built from them.
+# The window subclasses these to draw them. Nothing in this module imports
+# pygame, so games can be simulated without a display, much faster than
+# real time.
+import random
+import time
+from array import array
+from collections import deque
+
+# Board geometry
+WINDOW_WIDTH = 800
+WINDOW_HEIGHT = 600
+GRID_SIZE = 20
+GRID_WIDTH = WINDOW_WIDTH // GRID_SIZE
+GRID_HEIGHT = WINDOW_HEIGHT // GRID_SIZE
+
+# Game pace: in the window one move spans ANIMATION_STEPS + 1 frames
+ANIMATION_STEPS = 10  # Number of steps for smooth movement
+SNAKE_SPEED = 60  # Increased for smoother animation
+MOVE_INTERVAL_MS = 1000 * (ANIMATION_STEPS + 1) / SNAKE_SPEED
+INPUT_BUFFER_SIZE = 3  # Turns queued ahead of the moves that apply them
+
+# Food characteristics
+BONUS_FOOD_POINTS = 5
+BONUS_FOOD_CHANCE = 0.2  # 20% chance to spawn bonus food
+BONUS_FOOD_DURATION = 5000  # 5 seconds in milliseconds
+
+# Barrier characteristics
+BASE_NUM_BARRIERS = 4  # Base number of wall structures
+MIN_WALL_LENGTH = 5  # Minimum length of each wall
+MAX_WALL_LENGTH = 8  # Maximum length of each wall
+
+# Directional constants
+UP = (0, -1)
+DOWN = (0, 1)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+
+# Occupancy flags for OccupancyGrid.cells
+BARRIER_CELL = 1
+FOOD_CELL = 2
+BONUS_FOOD_CELL = 4
+
+# Causes of death
+HIT_BARRIER = "barrier"
+HIT_SELF = "self"
+BOARD_FULL = "board_full"
+
+_cell_id_templates = {}
+
+def _cell_ids(count):
+    # array('i', range(count)), copied from a cached template
+    template = _cell_id_templates.get(count)
+    if template is None:
+        template = _cell_id_templates[count] = array('i', range(count))
+    return template[:]
+
+class OccupancyGrid:
+    # Shared board state for constant-time collision and spawn checks. Cells
+    # are indexed by width * y + x. `cells` holds the barrier/food flags
+    # and `snake` counts snake segments per cell (a quick turn-back can fold
+    # the body onto itself, so a bit is not enough).
+    #
+    # Free cells are also kept in a swap-remove array (`free_cells`, with each
+    # cell's slot in `free_slot` or -1), so picking a random free cell is O(1)
+    # and a full board is detected instead of searched for forever.
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.cells = bytearray(width * height)
+        self.snake = bytearray(width * height)
+        self.free_cells = _cell_ids(width * height)
+        self.free_slot = _cell_ids(width * height)
+        self.barriers = None
+        self.barrier_cells = []
+
+    def index(self, pos):
+        return self.width * pos[1] + pos[0]
+
+    def sync_barriers(self, barriers):
+        # `barriers` is a list of wall cells (from level_cells) or has them in
+        # `positions` (a BarrierField). Cheap when it is unchanged; rebuilt
+        # after a new level
+        if barriers is self.barriers:
+            return
+        self.set_barrier_cells(barriers if isinstance(barriers, list) else barriers.positions)
+        self.barriers = barriers
+
+    def set_barrier_cells(self, positions):
+        for pos in self.barrier_cells:
+            i = self.index(pos)
+            self.cells[i] &= ~BARRIER_CELL
+            self._refresh(i)
+        for pos in positions:
+            i = self.index(pos)
+            self.cells[i] |= BARRIER_CELL
+            self._refresh(i)
+        self.barrier_cells = positions
+        self.barriers = None
+
+    def _refresh(self, i):
+        # Keep cell i's membership in free_cells in step with its occupancy
+        free = not self.cells[i] and not self.snake[i]
+        slot = self.free_slot[i]
+        if free and slot < 0:
+            self._release(i)
+        elif not free and slot >= 0:
+            self._take(i)
+
+    def _take(self, i):
+        slot = self.free_slot[i]
+        last = self.free_cells.pop()
+        if last != i:
+            self.free_cells[slot] = last
+            self.free_slot[last] = slot
+        self.free_slot[i] = -1
+
+    def _release(self, i):
+        self.free_slot[i] = len(self.free_cells)
+        self.free_cells.append(i)
+
+    def random_free_cell(self, rng=random):
+        # None when every cell is taken
+        if not self.free_cells:
+            return None
+        i = self.free_cells[rng.randrange(len(self.free_cells))]
+        return (i % self.width, i // self.width)
+
+    def is_barrier(self, pos):
+        return self.cells[self.width * pos[1] + pos[0]] & BARRIER_CELL
+
+    def is_free(self, pos):
+        i = self.width * pos[1] + pos[0]
+        return not self.cells[i] and not self.snake[i]
+
+    def set_flag(self, pos, flag):
+        i = self.index(pos)
+        self.cells[i] |= flag
+        self._refresh(i)
+
+    def clear_flag(self, pos, flag):
+        i = self.index(pos)
+        self.cells[i] &= ~flag
+        self._refresh(i)
+
+    def snake_count(self, pos):
+        return self.snake[self.width * pos[1] + pos[0]]
+
+    def add_snake(self, pos):
+        i = self.width * pos[1] + pos[0]
+        self.snake[i] += 1
+        self._refresh(i)
+
+    def remove_snake(self, pos):
+        i = self.width * pos[1] + pos[0]
+        self.snake[i] -= 1
+        self._refresh(i)
+
+def barrier_cells(level, rng=random, width=GRID_WIDTH, height=GRID_HEIGHT):
+    # Cells covered by the level's walls. Walls may cross, so a cell can be
+    # listed more than once. Boards larger than the window get walls in
+    # proportion to their area, so big worlds are as dense as the classic one.
+    cells = []
+    num_barriers = BASE_NUM_BARRIERS + (level - 1) * 2  # Add 2 more barriers per level
+    num_barriers *= max(1, (width * height) // (GRID_WIDTH * GRID_HEIGHT))
+    
+    # Create walls in different directions
+    for _ in range(num_barriers):
+        # Randomly choose wall direction (horizontal or vertical)
+        is_horizontal = rng.choice([True, False])
+        
+        # Choose starting position
+        if is_horizontal:
+            start_x = rng.randint(2, width - MAX_WALL_LENGTH - 2)
+            start_y = rng.randint(2, height - 2)
+            wall_length = rng.randint(MIN_WALL_LENGTH, MAX_WALL_LENGTH)
+            
+            # Create horizontal wall
+            for x in range(wall_length):
+                pos = (start_x + x, start_y)
+                # Avoid center area where snake starts
+                if abs(pos[0] - width//2) > 3 or abs(pos[1] - height//2) > 3:
+                    cells.append(pos)
+        else:
+            start_x = rng.randint(2, width - 2)
+            start_y = rng.randint(2, height - MAX_WALL_LENGTH - 2)
+            wall_length = rng.randint(MIN_WALL_LENGTH, MAX_WALL_LENGTH)
+            
+            # Create vertical wall
+            for y in range(wall_length):
+                pos = (start_x, start_y + y)
+                # Avoid center area where snake starts
+                if abs(pos[0] - width//2) > 3 or abs(pos[1] - height//2) > 3:
+                    cells.append(pos)
+    
+    return cells
+
+def level_rng(seed, level):
+    # Each level draws its walls from its own generator, seeded from the game
+    # seed and the level number, so a seed gives the same levels everywhere
+    return random.Random(f"{seed}:{level}")
+
+def level_cells(level, rng=random, width=GRID_WIDTH, height=GRID_HEIGHT):
+    # The level's wall cells, each listed once. Any region the walls from
+    # barrier_cells() seal off is opened by removing the fewest wall cells
+    # between it and the snake's start cell, so every free cell (and so every
+    # food) can be reached. Most layouts can't seal anything, which only
+    # costs a look at the walls; the rest get at most two passes over the
+    # board.
+    cells = list(dict.fromkeys(barrier_cells(level, rng, width, height)))
+    walls = bytearray(width * height)
+    for x, y in cells:
+        walls[width * y + x] = 1
+    if not _may_seal(walls, cells, width, height):
+        return cells
+    start = width * (height // 2) + width // 2
+    if open_sealed_regions(walls, width, height, start):
+        cells = [p for p in cells if walls[width * p[1] + p[0]]]
+    return cells
+
+def _may_seal(walls, cells, width, height):
+    # Whether the walls might enclose a free cell. Wall cells joined to their
+    # 8 neighbours form a plane graph (a diagonal only where neither cell
+    # beside it is a wall, so no edges cross); by Euler's formula it has
+    # E - V + C bounded faces. A face that holds no free cell is a 2x2 block
+    # of walls, so more faces than blocks means something may be enclosed.
+    # Walls on the board's edge could close a loop around the wrap, so those
+    # always count as possibly sealing.
+    edges = blocks = 0
+    for x, y in cells:
+        if not (0 < x < width - 1 and 0 < y < height - 1):
+            return True
+        i = width * y + x
+        right = walls[i + 1]
+        below = walls[i + width]
+        if right and below and walls[i + width + 1]:
+            blocks += 1
+        edges += right + below
+        if not below:
+            if not right and walls[i + width + 1]:
+                edges += 1
+            if not walls[i - 1] and walls[i + width - 1]:
+                edges += 1
+
+    # The components, 8-connected
+    seen = bytearray(len(walls))
+    components = 0
+    for x, y in cells:
+        i = width * y + x
+        if seen[i]:
+            continue
+        components += 1
+        seen[i] = 1
+        stack = [i]
+        while stack:
+            j = stack.pop()
+            for k in (j - width - 1, j - width, j - width + 1, j - 1, j + 1,
+                      j + width - 1, j + width, j + width + 1):
+                if walls[k] and not seen[k]:
+                    seen[k] = 1
+                    stack.append(k)
+    return edges - len(cells) + components > blocks
+
+def _neighbours(i, width, size):
+    # The board wraps at its edges, like the snake
+    x = i % width
+    row = i - x
+    return (row + (x + 1) % width, row + (x - 1) % width, (i + width) % size, (i - width) % size)
+
+def open_sealed_regions(walls, width, height, start):
+    # Clears wall cells in place until every free cell is reachable from
+    # `start`; returns whether any wall was removed
+    size = width * height
+    reached = bytearray(size)
+    reached[start] = 1
+    stack = [start]
+    count = 1
+    while stack:
+        for j in _neighbours(stack.pop(), width, size):
+            if not reached[j] and not walls[j]:
+                reached[j] = 1
+                stack.append(j)
+                count += 1
+    if count == size - sum(walls):
+        return False
+
+    # 0-1 BFS: stepping onto a wall costs 1, so each cell's parent chain is
+    # a path from the start through the fewest walls
+    cost = [size] * size
+    parent = array('i', bytes(4 * size))
+    cost[start] = 0
+    queue = deque([start])
+    while queue:
+        i = queue.popleft()
+        c = cost[i]
+        for j in _neighbours(i, width, size):
+            if c + walls[j] < cost[j]:
+                cost[j] = c + walls[j]
+                parent[j] = i
+                if walls[j]:
+                    queue.append(j)
+                else:
+                    queue.appendleft(j)
+    # Breach the walls on the path to each sealed cell; cells already on an
+    # opened path cost 0, which ends the walk early
+    for i in range(size):
+        if not walls[i] and cost[i]:
+            while cost[i]:
+                walls[i] = 0
+                cost[i] = 0
+                i = parent[i]
+    return True
+
+def start_positions(grid, length, start=None):
+    # A new snake's cells, head first, in a row ending at `start`
+    x, y = start if start is not None else (grid.width // 2, grid.height // 2)
+    return [((x - i) % grid.width, y) for i in range(length)]
+
+def _monotonic_ms():
+    return time.monotonic() * 1000
+
+class Snake:
+    # One snake on a shared grid: buffered turns, moving, growing and dying.
+    # Walls, food and other snakes are all looked up in the grid, which
+    # counts this snake's segments too.
+    __slots__ = ("grid", "length", "positions", "direction", "turns", "score", "last_tail",
+                 "death_cause")
+
+    def __init__(self, grid=None, start=None):
+        # Share one grid with Food and BonusFood so spawns see the body.
+        # `start` is the head's cell, the board's centre by default; the body
+        # trails to its left.
+        self.grid = grid if grid is not None else OccupancyGrid()
+        self.length = 3  # Start with 3 segments
+        # Head on the left; a move pushes the head and pops the tail
+        self.positions = deque(start_positions(self.grid, self.length, start))
+        for p in self.positions:
+            self.grid.add_snake(p)
+        self.direction = RIGHT  # Start moving right
+        self.turns = deque()  # Buffered turns, one applied per move
+        self.score = 0
+        self.last_tail = None  # Cell the tail left on the last move
+        self.death_cause = None  # HIT_BARRIER or HIT_SELF once update() fails
+
+    def get_head_position(self):
+        return self.positions[0]
+
+    def queue_direction(self, direction):
+        # Turns are checked against the last queued one, so quick key presses
+        # between two moves all apply, one per move, and can't reverse the snake
+        last = self.turns[-1] if self.turns else self.direction
+        if direction == last or (direction[0] + last[0], direction[1] + last[1]) == (0, 0):
+            return False
+        if len(self.turns) < INPUT_BUFFER_SIZE:
+            self.turns.append(direction)
+            return True
+        return False
+
+    def update(self, barriers=None):
+        # One logic tick: move one cell, or return False on a collision (see
+        # death_cause). `barriers` are synced into the grid first if given.
+        if self.turns:
+            self.direction = self.turns.popleft()
+        grid = self.grid
+        if barriers is not None:
+            grid.sync_barriers(barriers)
+        positions = self.positions
+        head = positions[0]
+        x, y = self.direction
+        width = grid.width
+        next_head = ((head[0] + x) % width, (head[1] + y) % grid.height)
+        i = width * next_head[1] + next_head[0]
+
+        # Check for collision with barriers
+        cells = grid.cells
+        if cells[i] & BARRIER_CELL:
+            self.death_cause = HIT_BARRIER
+            return False
+
+        # Body from the fourth segment on; the grid counts every segment
+        snake = grid.snake
+        head_hits = (head == next_head) + (positions[1] == next_head) + (positions[2] == next_head)
+        if snake[i] > head_hits:
+            self.death_cause = HIT_SELF
+            return False
+
+        # Every other segment moves onto its predecessor's cell. Inlined
+        # grid.add_snake / remove_snake; this is the hot path
+        positions.appendleft(next_head)
+        snake[i] += 1
+        if grid.free_slot[i] >= 0:
+            grid._take(i)
+        self.last_tail = None
+        # Only remove the last position if we haven't grown
+        if len(positions) > self.length:
+            tail = self.last_tail = positions.pop()
+            j = width * tail[1] + tail[0]
+            snake[j] -= 1
+            if not snake[j] and not cells[j]:
+                grid._release(j)
+        return True
+
+    def reset(self, start=None):
+        for p in self.positions:
+            self.grid.remove_snake(p)
+        self.length = 3  # Reset to 3 segments
+        self.positions = deque(start_positions(self.grid, self.length, start))
+        for p in self.positions:
+            self.grid.add_snake(p)
+        self.direction = RIGHT
+        self.turns.clear()
+        self.score = 0
+        self.last_tail = None
+        self.death_cause = None
+
+class Food:
+    __slots__ = ("grid", "rng", "position")
+
+    def __init__(self, grid=None, rng=random):
+        self.grid = grid if grid is not None else OccupancyGrid()
+        self.rng = rng
+        self.position = None  # Not on the board until randomize_position()
+
+    def randomize_position(self, barriers=None, snake_positions=None):
+        # Barriers and the snake body are looked up in the shared grid
+        # (`barriers` are synced into it first if given). Returns False when
+        # the board is full and no food can be placed.
+        if barriers is not None:
+            self.grid.sync_barriers(barriers)
+        if self.position is not None:
+            self.grid.clear_flag(self.position, FOOD_CELL)
+        # Make sure food doesn't spawn on barriers or snake
+        position = self.grid.random_free_cell(self.rng)
+        if position is None:
+            return False
+        self.position = position
+        self.grid.set_flag(self.position, FOOD_CELL)
+        return True
+
+class BonusFood:
+    __slots__ = ("grid", "clock", "rng", "position", "active", "spawn_time", "duration")
+
+    def __init__(self, grid=None, clock=_monotonic_ms, rng=random):
+        self.grid = grid if grid is not None else OccupancyGrid()
+        self.clock = clock  # Milliseconds; games pass their logic-tick time
+        self.rng = rng
+        self.position = None
+        self.active = False
+        self.spawn_time = 0
+        self.duration = BONUS_FOOD_DURATION
+
+    def spawn(self, barriers=None, snake_positions=None, food_position=None):
+        if not self.active and self.rng.random() < BONUS_FOOD_CHANCE:
+            # Barriers, the snake body and the food are looked up in the shared grid
+            if barriers is not None:
+                self.grid.sync_barriers(barriers)
+            position = self.grid.random_free_cell(self.rng)
+            if position is None:
+                return  # Board is full
+            self.position = position
+            self.active = True
+            self.spawn_time = self.clock()
+            self.grid.set_flag(self.position, BONUS_FOOD_CELL)
+
+    def update(self):
+        if self.active:
+            current_time = self.clock()
+            if current_time - self.spawn_time > self.duration:
+                self.collect()
+
+    def collect(self):
+        # Eaten or expired
+        self.grid.clear_flag(self.position, BONUS_FOOD_CELL)
+        self.active = False
+        self.position = None
+
+class GameEngine:
+    # One single-player game: a Snake, Food and BonusFood on one grid, and a
+    # new wall layout every 10 length. One step() is one snake move. Time
+    # only advances through moves; bonus food expiry reads `clock`
+    # (milliseconds), which defaults to the ticks played times
+    # MOVE_INTERVAL_MS, i.e. the pace of the windowed game. Food comes from
+    # a generator seeded per game and each level's walls from level_rng, so
+    # a seed plus the turns reproduce the game exactly.
+    #
+    # The window's GameSession is a subclass: it swaps in the drawable
+    # snake_type / food_type / bonus_type and builds its levels through
+    # build_level().
+    #
+    #   engine = GameEngine(seed=7)
+    #   while engine.step(policy(engine)):
+    #       pass
+    snake_type = Snake
+    food_type = Food
+    bonus_type = BonusFood
+
+    def __init__(self, seed=None, width=GRID_WIDTH, height=GRID_HEIGHT, clock=None):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.clock = clock
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        # Without a seed the same game is played again; an unseeded engine
+        # picks one once, like the window does per game
+        if seed is not None:
+            self.seed = seed
+        elif self.seed is None:
+            self.seed = random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.grid = OccupancyGrid(self.width, self.height)
+        self.ticks = 0
+        self.cause = None
+        self.snake = self.snake_type(self.grid)
+        self.food = self.food_type(self.grid, self.rng)
+        self.bonus_food = self.bonus_type(self.grid, clock=self.now, rng=self.rng)
+        self.level = 1
+        self.barriers = self.build_level(self.level)
+        self.grid.sync_barriers(self.barriers)
+        self.food.randomize_position()
+
+    def build_level(self, level):
+        # The level's walls: a list of cells, or anything with them in `positions`
+        return level_cells(level, level_rng(self.seed, level), self.width, self.height)
+
+    def now(self):
+        # Game time in milliseconds
+        if self.clock is not None:
+            return self.clock()
+        return self.ticks * MOVE_INTERVAL_MS
+
+    # The snake's and the food's state, for policies and the runner
+    @property
+    def alive(self):
+        return self.cause is None
+
+    @property
+    def positions(self):
+        return self.snake.positions
+
+    @property
+    def direction(self):
+        return self.snake.direction
+
+    @property
+    def length(self):
+        return self.snake.length
+
+    @property
+    def score(self):
+        return self.snake.score
+
+    @property
+    def food_position(self):
+        return self.food.position
+
+    @property
+    def bonus_position(self):
+        return self.bonus_food.position
+
+    def turn(self, direction):
+        # Player input, applied on a later move; False if the snake ignores it
+        return self.snake.queue_direction(direction)
+
+    def step(self, action=None):
+        # Advance one move. `action` is a direction or None to keep going;
+        # turning straight back is ignored like in the window. Returns False
+        # once the game is over (see `cause`).
+        if self.cause is not None:
+            return False
+        if action is not None:
+            self.turn(action)
+        if not self.update_snake():
+            return False
+        # Most moves eat nothing; skip the food rules for those
+        if self.snake.positions[0] == self.food.position or self.bonus_food.active:
+            return self.update_food()
+        return True
+
+    def tick(self):
+        return self.update_snake() and self.update_food()
+
+    def update_snake(self):
+        self.ticks += 1
+        if not self.snake.update():
+            self.cause = self.snake.death_cause
+            return False
+        return True
+
+    def update_food(self):
+        # Eating, spawning and level-ups after a move; False when the board is full
+        snake = self.snake
+        food = self.food
+        bonus_food = self.bonus_food
+        head = snake.positions[0]
+
+        # Check if snake ate the food
+        if head == food.position:
+            snake.length += 1
+            snake.score += 1
+            if not food.randomize_position():
+                # No free cell left for food
+                self.cause = BOARD_FULL
+                return False
+            bonus_food.spawn()
+
+            # Check for level up
+            if snake.length % 10 == 0:
+                self.level += 1
+                self.barriers = self.build_level(self.level)
+                self.grid.sync_barriers(self.barriers)
+                # The new walls may cover the food that was just placed
+                if self.grid.is_barrier(food.position) and not food.randomize_position():
+                    self.cause = BOARD_FULL
+                    return False
+
+        # Check if snake ate the bonus food
+        if bonus_food.active:
+            if head == bonus_food.position:
+                snake.score += BONUS_FOOD_POINTS
+                bonus_food.collect()
+            else:
+                bonus_food.update()
+        return True
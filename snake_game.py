@@ -1,18 +1,24 @@
 import pygame
+import numpy as np
 import random
 import sys
 import math
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from itertools import chain, islice
 
-# Initialize Pygame
-pygame.init()
-
-# Constants
-WINDOW_WIDTH = 800
-WINDOW_HEIGHT = 600
-GRID_SIZE = 20
-GRID_WIDTH = WINDOW_WIDTH // GRID_SIZE
-GRID_HEIGHT = WINDOW_HEIGHT // GRID_SIZE
-ANIMATION_STEPS = 10  # Number of steps for smooth movement
+import snake_engine
+from snake_engine import (WINDOW_WIDTH, WINDOW_HEIGHT, GRID_SIZE, GRID_WIDTH, GRID_HEIGHT,
+                          SNAKE_SPEED, MOVE_INTERVAL_MS, UP, DOWN, LEFT, RIGHT, HIT_BARRIER,
+                          HIT_SELF, BOARD_FULL, GameEngine, level_cells, level_rng)
+from history_store import HistoryStore, make_entry
+from background_writer import BackgroundWriter, FSYNC_BATCH, FSYNC_POLICIES
+from replay import Replay, ReplayFiles, ReplayPlayer, replay_path
+from autopilot import Autopilot
+from frame_profiler import (FrameProfiler, EVENTS, SNAKE_UPDATE, FOOD_BONUS, BARRIER_RENDER,
+                            SNAKE_RENDER, HUD_RENDER, DISPLAY_FLIP)
 
 # Colors
 BLACK = (0, 0, 0)
@@ -32,9 +38,24 @@ HOVER_COLOR = (100, 255, 100)  # Color for menu hover effect
 MENU = "menu"
 PLAYING = "playing"
 HISTORY = "history"
+REPLAY = "replay"
+
+# How each game ended, as shown on the history screen
+CAUSE_LABELS = {HIT_BARRIER: "wall", HIT_SELF: "bit itself", BOARD_FULL: "board full"}
+
+# Timing: logic runs at a fixed rate, rendering at whatever rate the display allows
+LOGIC_TICK_MS = MOVE_INTERVAL_MS  # One snake move; same pace as the old frame-counted animation
+MAX_FRAME_MS = 1000  # Longest stall caught up on in one frame
+
+# Replay playback
+REPLAY_SPEEDS = (1, 10)  # Tab switches between these
+REPLAY_SEEK_TICKS = 50  # Left/Right jump this far
+
+# Render modes
+FULL_FRAME = "full"  # Push the whole window every frame
+DIRTY_RECTS = "dirty"  # Push only the areas that changed
 
 # Snake characteristics
-SNAKE_SPEED = 60  # Increased for smoother animation
 SNAKE_BLOCK_SIZE = 20
 SNAKE_COLOR = GREEN
 SNAKE_HEAD_COLOR = (0, 200, 0)  # Slightly darker green for head
@@ -43,180 +64,382 @@ SNAKE_HEAD_COLOR = (0, 200, 0)  # Slightly darker green for head
 FOOD_COLOR = RED
 FOOD_SIZE = 20
 BONUS_FOOD_COLOR = GOLD
-BONUS_FOOD_POINTS = 5
-BONUS_FOOD_CHANCE = 0.2  # 20% chance to spawn bonus food
 
 # Barrier characteristics
 BARRIER_COLOR = GRAY
 BARRIER_BORDER_COLOR = DARK_GRAY
-BASE_NUM_BARRIERS = 4  # Base number of wall structures
-MIN_WALL_LENGTH = 5  # Minimum length of each wall
-MAX_WALL_LENGTH = 8  # Maximum length of each wall
-
-class Barrier:
-    def __init__(self, position):
-        self.position = position
-        self.color = BARRIER_COLOR
-        self.border_color = BARRIER_BORDER_COLOR
-        self.pattern_offset = random.randint(0, 100)  # Random pattern offset
-        self.shine_angle = random.uniform(0, 2 * 3.14159)  # Random shine angle
 
-    def render(self, surface):
-        # Base rectangle
-        r = pygame.Rect((self.position[0] * GRID_SIZE,
-                        self.position[1] * GRID_SIZE),
-                       (GRID_SIZE, GRID_SIZE))
-        
-        # Draw main barrier color with gradient effect
-        for i in range(GRID_SIZE):
-            # Calculate gradient color
-            gradient_factor = i / GRID_SIZE
-            current_color = (
-                int(self.color[0] * (1 - gradient_factor * 0.3)),
-                int(self.color[1] * (1 - gradient_factor * 0.3)),
-                int(self.color[2] * (1 - gradient_factor * 0.3))
-            )
-            pygame.draw.line(surface, current_color,
-                           (r.left, r.top + i),
-                           (r.right, r.top + i))
-
-        # Draw 3D effect
-        # Top and left edges (lighter)
-        pygame.draw.line(surface, LIGHT_GRAY,
-                        (r.left, r.top),
-                        (r.right, r.top), 2)
-        pygame.draw.line(surface, LIGHT_GRAY,
-                        (r.left, r.top),
-                        (r.left, r.bottom), 2)
-        
-        # Bottom and right edges (darker)
-        pygame.draw.line(surface, VERY_DARK_GRAY,
-                        (r.left, r.bottom),
-                        (r.right, r.bottom), 2)
-        pygame.draw.line(surface, VERY_DARK_GRAY,
-                        (r.right, r.top),
-                        (r.right, r.bottom), 2)
-
-        # Draw pattern
-        pattern_spacing = 4
-        for i in range(0, GRID_SIZE, pattern_spacing):
-            # Draw diagonal lines
-            start_x = r.left + (i + self.pattern_offset) % GRID_SIZE
-            pygame.draw.line(surface, DARK_GRAY,
-                           (start_x, r.top),
-                           (start_x + pattern_spacing, r.bottom),
-                           1)
-
-        # Draw shine effect
-        shine_width = 3
-        shine_pos = int((GRID_SIZE / 2) * (1 + math.sin(self.shine_angle)))
-        pygame.draw.line(surface, LIGHT_GRAY,
-                        (r.left + shine_pos, r.top),
-                        (r.left + shine_pos + shine_width, r.top),
-                        1)
-
-        # Draw corner highlights
-        corner_size = 3
-        # Top-left corner
-        pygame.draw.line(surface, WHITE,
-                        (r.left, r.top),
-                        (r.left + corner_size, r.top), 1)
-        pygame.draw.line(surface, WHITE,
-                        (r.left, r.top),
-                        (r.left, r.top + corner_size), 1)
-        
-        # Bottom-right corner
-        pygame.draw.line(surface, VERY_DARK_GRAY,
-                        (r.right, r.bottom),
-                        (r.right - corner_size, r.bottom), 1)
-        pygame.draw.line(surface, VERY_DARK_GRAY,
-                        (r.right, r.bottom),
-                        (r.right, r.bottom - corner_size), 1)
-
-        # Draw border
-        pygame.draw.rect(surface, self.border_color, r, 1)
-
-        # Update pattern offset and shine angle for animation
-        self.pattern_offset = (self.pattern_offset + 1) % 100
-        self.shine_angle += 0.1
-
-class Snake:
-    def __init__(self):
-        self.length = 3  # Start with 3 segments
-        self.positions = [(GRID_WIDTH // 2, GRID_HEIGHT // 2)]
-        # Initialize body segments
-        for i in range(self.length - 1):
-            self.positions.append((GRID_WIDTH // 2 - i - 1, GRID_HEIGHT // 2))
-        self.direction = RIGHT  # Start moving right
-        self.color = SNAKE_COLOR
-        self.score = 0
-        self.animation_step = 0
-        self.next_positions = []
-        self.is_moving = False
+# Barrier tiles are drawn with some overdraw around the cell (bevels and the
+# diagonal pattern spill past the 20x20 rect), so cached tiles are padded.
+BARRIER_TILE_PADDING = 4
+BARRIER_TILE_SIZE = GRID_SIZE + 2 * BARRIER_TILE_PADDING
+BARRIER_TILE_COLORKEY = (255, 0, 255)  # Never used by barrier artwork
+TILE_WARMUP_PER_FRAME = 40  # Barrier tiles rendered per menu frame until all are cached
+BARRIER_ANIMATION_STEP_MS = 1000 / 60  # Game time per wall animation step, whatever the frame rate
 
-    def get_head_position(self):
-        return self.positions[0]
+def barrier_shine_position(shine_angle):
+    return int((GRID_SIZE / 2) * (1 + math.sin(shine_angle)))
 
-    def update(self, barriers):
-        if not self.is_moving:
-            self.animation_step = 0
-            cur = self.get_head_position()
-            x, y = self.direction
-            next_head = ((cur[0] + x) % GRID_WIDTH, (cur[1] + y) % GRID_HEIGHT)
-            
-            # Check for collision with barriers
-            if any(next_head == barrier.position for barrier in barriers):
-                return False
-                
-            if next_head in self.positions[3:]:
-                return False
-            
-            # Calculate next positions for all segments
-            self.next_positions = [next_head]
-            for i in range(len(self.positions) - 1):
-                self.next_positions.append(self.positions[i])
-            
-            # Add a new position if the snake has grown
-            if len(self.next_positions) < self.length:
-                self.next_positions.append(self.positions[-1])
-                
-            self.is_moving = True
-            return True
-
-        # Update animation step
-        self.animation_step += 1
-        if self.animation_step >= ANIMATION_STEPS:
-            self.positions = self.next_positions
-            # Only remove the last position if we haven't grown
-            if len(self.positions) > self.length:
-                self.positions.pop()
-            self.is_moving = False
-            return True
+def draw_barrier_base(surface, left, top, color=BARRIER_COLOR):
+    # Base rectangle
+    r = pygame.Rect((left, top), (GRID_SIZE, GRID_SIZE))
+
+    # Draw main barrier color with gradient effect
+    for i in range(GRID_SIZE):
+        # Calculate gradient color
+        gradient_factor = i / GRID_SIZE
+        current_color = (
+            int(color[0] * (1 - gradient_factor * 0.3)),
+            int(color[1] * (1 - gradient_factor * 0.3)),
+            int(color[2] * (1 - gradient_factor * 0.3))
+        )
+        pygame.draw.line(surface, current_color,
+                       (r.left, r.top + i),
+                       (r.right, r.top + i))
+
+    # Draw 3D effect
+    # Top and left edges (lighter)
+    pygame.draw.line(surface, LIGHT_GRAY,
+                    (r.left, r.top),
+                    (r.right, r.top), 2)
+    pygame.draw.line(surface, LIGHT_GRAY,
+                    (r.left, r.top),
+                    (r.left, r.bottom), 2)
+
+    # Bottom and right edges (darker)
+    pygame.draw.line(surface, VERY_DARK_GRAY,
+                    (r.left, r.bottom),
+                    (r.right, r.bottom), 2)
+    pygame.draw.line(surface, VERY_DARK_GRAY,
+                    (r.right, r.top),
+                    (r.right, r.bottom), 2)
+
+def draw_barrier_pattern(surface, left, top, pattern_offset, shine_pos):
+    # Draw pattern
+    pattern_spacing = 4
+    for i in range(0, GRID_SIZE, pattern_spacing):
+        # Draw diagonal lines
+        start_x = left + (i + pattern_offset) % GRID_SIZE
+        pygame.draw.line(surface, DARK_GRAY,
+                       (start_x, top),
+                       (start_x + pattern_spacing, top + GRID_SIZE),
+                       1)
+
+    # Draw shine effect
+    shine_width = 3
+    pygame.draw.line(surface, LIGHT_GRAY,
+                    (left + shine_pos, top),
+                    (left + shine_pos + shine_width, top),
+                    1)
+
+def draw_barrier_trim(surface, left, top, border_color=BARRIER_BORDER_COLOR):
+    r = pygame.Rect((left, top), (GRID_SIZE, GRID_SIZE))
+
+    # Draw corner highlights
+    corner_size = 3
+    # Top-left corner
+    pygame.draw.line(surface, WHITE,
+                    (r.left, r.top),
+                    (r.left + corner_size, r.top), 1)
+    pygame.draw.line(surface, WHITE,
+                    (r.left, r.top),
+                    (r.left, r.top + corner_size), 1)
+
+    # Bottom-right corner
+    pygame.draw.line(surface, VERY_DARK_GRAY,
+                    (r.right, r.bottom),
+                    (r.right - corner_size, r.bottom), 1)
+    pygame.draw.line(surface, VERY_DARK_GRAY,
+                    (r.right, r.bottom),
+                    (r.right, r.bottom - corner_size), 1)
+
+    # Draw border
+    pygame.draw.rect(surface, border_color, r, 1)
+
+def draw_barrier_cell(surface, left, top, pattern_offset, shine_pos,
+                      color=BARRIER_COLOR, border_color=BARRIER_BORDER_COLOR):
+    draw_barrier_base(surface, left, top, color)
+    draw_barrier_pattern(surface, left, top, pattern_offset, shine_pos)
+    draw_barrier_trim(surface, left, top, border_color)
+
+class BarrierTileAtlas:
+    # Caches one pre-rendered tile per visual variant of a barrier cell. The
+    # pattern only depends on pattern_offset % GRID_SIZE and the shine on its
+    # integer pixel position, so there are at most GRID_SIZE * (GRID_SIZE + 1)
+    # tiles per colour scheme.
+    VARIANTS = GRID_SIZE * (GRID_SIZE + 1)
+
+    def __init__(self, draw=draw_barrier_cell):
+        self.draw = draw
+        self.tiles = {}
+        self.rendered = {}  # (color, border_color) -> variants cached so far
+        self.tables = {}  # (color, border_color) -> list for table()
+
+    def get(self, pattern_offset, shine_angle,
+            color=BARRIER_COLOR, border_color=BARRIER_BORDER_COLOR):
+        return self.variant(pattern_offset % GRID_SIZE, barrier_shine_position(shine_angle),
+                            color, border_color)
+
+    def variant(self, phase, shine_pos, color=BARRIER_COLOR, border_color=BARRIER_BORDER_COLOR):
+        key = (phase, shine_pos, color, border_color)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self._render_tile(*key)
+            self.tiles[key] = tile
+            scheme = (color, border_color)
+            self.rendered[scheme] = self.rendered.get(scheme, 0) + 1
+        return tile
 
+    def complete(self, color=BARRIER_COLOR, border_color=BARRIER_BORDER_COLOR):
+        # Whether every variant of the scheme is cached, so table() costs nothing
+        return self.rendered.get((color, border_color), 0) == self.VARIANTS
+
+    def prerender(self, color=BARRIER_COLOR, border_color=BARRIER_BORDER_COLOR, limit=None):
+        # Warm every variant up front so no tile is rasterized mid-game. With
+        # `limit`, renders at most that many tiles, so warming can be spread
+        # over frames; True once every variant is cached.
+        for phase in range(GRID_SIZE):
+            for shine_pos in range(GRID_SIZE + 1):
+                key = (phase, shine_pos, color, border_color)
+                if key not in self.tiles:
+                    if limit is not None:
+                        if limit <= 0:
+                            return False
+                        limit -= 1
+                    self.variant(phase, shine_pos, color, border_color)
+        return True
+
+    def table(self, color=BARRIER_COLOR, border_color=BARRIER_BORDER_COLOR):
+        # Every variant of a colour scheme in one list, indexed by
+        # phase * (GRID_SIZE + 1) + shine position (see BarrierField.tile_indices)
+        table = self.tables.get((color, border_color))
+        if table is None:
+            self.prerender(color, border_color)
+            table = [self.tiles[(phase, shine_pos, color, border_color)]
+                     for phase in range(GRID_SIZE) for shine_pos in range(GRID_SIZE + 1)]
+            self.tables[(color, border_color)] = table
+        return table
+
+    def _render_tile(self, phase, shine_pos, color, border_color):
+        tile = pygame.Surface((BARRIER_TILE_SIZE, BARRIER_TILE_SIZE))
+        if pygame.display.get_surface() is not None:
+            tile = tile.convert()
+        tile.fill(BARRIER_TILE_COLORKEY)
+        self.draw(tile, BARRIER_TILE_PADDING, BARRIER_TILE_PADDING,
+                  phase, shine_pos, color, border_color)
+        tile.set_colorkey(BARRIER_TILE_COLORKEY, pygame.RLEACCEL)
+        return tile
+
+barrier_tiles = BarrierTileAtlas()
+
+class BarrierField:
+    # All barrier cells of a level as parallel arrays (struct of arrays):
+    # cell coordinates plus each cell's starting pattern offset and shine
+    # angle. Every cell animates in lockstep, so animate() only counts steps
+    # and each cell's look is worked out with NumPy when it is drawn; the
+    # tiles are looked up by a single index per cell, so there is no Python
+    # object per barrier. All cells share one colour scheme.
+    __slots__ = ("positions", "xs", "ys", "pattern_offset", "shine_angle", "steps", "color",
+                 "border_color")
+
+    def __init__(self, positions, rng=random, color=BARRIER_COLOR,
+                 border_color=BARRIER_BORDER_COLOR):
+        # Cells as (x, y), for the occupancy grid; the list is shared with it
+        self.positions = positions if isinstance(positions, list) else list(positions)
+        count = len(self.positions)
+        self.xs = np.fromiter((p[0] for p in self.positions), np.int32, count)
+        self.ys = np.fromiter((p[1] for p in self.positions), np.int32, count)
+        pattern_offset = []
+        shine_angle = []
+        for _ in range(count):
+            pattern_offset.append(rng.randint(0, 100))  # Random pattern offset
+            shine_angle.append(rng.uniform(0, 2 * 3.14159))  # Random shine angle
+        self.pattern_offset = np.array(pattern_offset, np.int16)
+        self.shine_angle = np.array(shine_angle, np.float64)
+        self.steps = 0  # Animation steps so far
+        self.color = color
+        self.border_color = border_color
+
+    def __len__(self):
+        return len(self.positions)
+
+    def tile_indices(self, cells=None):
+        # Index into BarrierTileAtlas.table() of each cell's current look, for
+        # every cell or only those in the index array `cells`
+        pattern_offset = self.pattern_offset if cells is None else self.pattern_offset[cells]
+        shine_angle = self.shine_angle if cells is None else self.shine_angle[cells]
+        # Each step moves the pattern one pixel and the shine by 0.1 rad
+        phase = (pattern_offset + self.steps % GRID_SIZE) % GRID_SIZE
+        shine_pos = ((GRID_SIZE / 2) * (1 + np.sin(shine_angle + 0.1 * self.steps))).astype(np.int32)
+        return phase * (GRID_SIZE + 1) + shine_pos
+
+    def tile_positions(self, offset=(0, 0), cells=None):
+        # Screen position of each cell's padded tile
+        xs = self.xs if cells is None else self.xs[cells]
+        ys = self.ys if cells is None else self.ys[cells]
+        return zip((xs * GRID_SIZE - (BARRIER_TILE_PADDING + offset[0])).tolist(),
+                   (ys * GRID_SIZE - (BARRIER_TILE_PADDING + offset[1])).tolist())
+
+    def animate(self, steps=1):
+        # Advance the animation; callers step it by game time (see
+        # BARRIER_ANIMATION_STEP_MS), not once per rendered frame
+        self.steps += steps
+
+    def render(self, surface, offset=(0, 0), cells=None):
+        # Every cell, or those in the sorted index array `cells`, as a full
+        # tile straight from the atlas. Padded tiles of neighbouring cells
+        # overlap, and they are blitted in the order the cells were created,
+        # so the result is pixel for pixel what drawing each cell did.
+        indices = self.tile_indices(cells).tolist()
+        if barrier_tiles.complete(self.color, self.border_color):
+            table = barrier_tiles.table(self.color, self.border_color)
+            tiles = [table[i] for i in indices]
+        else:
+            # A game started before the menu warmed every variant: render
+            # just the ones on screen now, not the whole atlas in one frame
+            variant = barrier_tiles.variant
+            tiles = [variant(*divmod(i, GRID_SIZE + 1), self.color, self.border_color)
+                     for i in indices]
+        surface.blits(zip(tiles, self.tile_positions(offset, cells)), doreturn=False)
+
+class BarrierLayer:
+    # A level's barrier field on a board that fits the window. The frame is
+    # cleared and every cell drawn from the atlas in one blits() call; the
+    # screen areas the walls cover are worked out once, for dirty-rect
+    # updates.
+    def __init__(self, barriers):
+        self.barriers = barriers
+        # Walls are created cell by cell and padded tiles of neighbouring
+        # cells overlap, so each wall collapses into a single rect
+        self.rects = []
+        for left, top in barriers.tile_positions():
+            r = pygame.Rect(left, top, BARRIER_TILE_SIZE, BARRIER_TILE_SIZE)
+            if self.rects and self.rects[-1].colliderect(r):
+                self.rects[-1].union_ip(r)
+            else:
+                self.rects.append(r)
+
+    def render(self, surface, offset=(0, 0)):
+        surface.fill(BLACK)
+        self.barriers.render(surface, offset)
+        if offset != (0, 0):
+            return [r.move(-offset[0], -offset[1]) for r in self.rects]
+        return self.rects
+
+class ChunkedBarrierLayer:
+    # Barrier layer for worlds bigger than the window. Barrier cells are
+    # bucketed into CHUNK_CELLS x CHUNK_CELLS chunks as index arrays into the
+    # BarrierField; only chunks that hold barriers exist, so a sparse field
+    # costs memory per barrier, not per cell. Each frame only the cells of
+    # chunks overlapping the view are drawn.
+    CHUNK_CELLS = 16
+
+    def __init__(self, barriers):
+        self.barriers = barriers
+        self.chunks = {}  # (chunk x, chunk y) -> indices into barriers
+        cx = barriers.xs // self.CHUNK_CELLS
+        cy = barriers.ys // self.CHUNK_CELLS
+        if len(barriers):
+            chunk_ids = cy.astype(np.int64) * (int(cx.max()) + 1) + cx
+            order = np.argsort(chunk_ids, kind="stable")
+            starts = np.flatnonzero(np.diff(chunk_ids[order], prepend=-1))
+            for cells in np.split(order, starts[1:]):
+                self.chunks[(int(cx[cells[0]]), int(cy[cells[0]]))] = cells
+
+    def visible_chunks(self, view):
+        # Chunk keys that hold barriers and overlap `view` (a Rect in world
+        # pixels). Padded tiles spill into neighbouring chunks, so the range
+        # is widened by the padding.
+        chunk_px = self.CHUNK_CELLS * GRID_SIZE
+        view = view.inflate(2 * BARRIER_TILE_PADDING, 2 * BARRIER_TILE_PADDING)
+        for cy in range(view.top // chunk_px, (view.bottom - 1) // chunk_px + 1):
+            for cx in range(view.left // chunk_px, (view.right - 1) // chunk_px + 1):
+                if (cx, cy) in self.chunks:
+                    yield (cx, cy)
+
+    def render(self, surface, offset=(0, 0)):
+        surface.fill(BLACK)
+        view = surface.get_rect().move(offset)
+        visible = [self.chunks[key] for key in self.visible_chunks(view)]
+        if visible:
+            # Back in creation order, so overlapping tiles stack as they would
+            # with the whole field drawn
+            self.barriers.render(surface, offset, np.sort(np.concatenate(visible)))
+        # The camera moves with the snake, so the whole view changes
+        return surface.get_rect()
+
+def make_barrier_layer(barriers, width=GRID_WIDTH, height=GRID_HEIGHT):
+    # The whole field when the board fits the window, visible chunks otherwise
+    if width * GRID_SIZE <= WINDOW_WIDTH and height * GRID_SIZE <= WINDOW_HEIGHT:
+        return BarrierLayer(barriers)
+    return ChunkedBarrierLayer(barriers)
+
+class Camera:
+    # Top-left corner of the view in world pixels. It keeps the snake's head
+    # centred, clamped so the view never leaves the world; on a board that
+    # fits the window it stays at (0, 0).
+    def __init__(self, view_size=(WINDOW_WIDTH, WINDOW_HEIGHT)):
+        self.view_size = view_size
+        self.offset = (0, 0)
+        self.moved = False  # Whether the last follow() changed the offset
+
+    def follow(self, cell, board_size):
+        # `cell` in (possibly fractional) grid units, `board_size` in cells
+        x = int(cell[0] * GRID_SIZE + GRID_SIZE / 2 - self.view_size[0] / 2)
+        y = int(cell[1] * GRID_SIZE + GRID_SIZE / 2 - self.view_size[1] / 2)
+        x = max(0, min(x, board_size[0] * GRID_SIZE - self.view_size[0]))
+        y = max(0, min(y, board_size[1] * GRID_SIZE - self.view_size[1]))
+        self.moved = (x, y) != self.offset
+        self.offset = (x, y)
+        return self.offset
+
+class Snake(snake_engine.Snake):
+    # The rules live in snake_engine.Snake; this adds drawing, sliding each
+    # segment from its previous cell
+    __slots__ = ("color", "is_moving")
+
+    def __init__(self, grid=None, start=None):
+        super().__init__(grid, start)
+        self.color = SNAKE_COLOR
+        self.is_moving = False  # Whether there is a last move to interpolate
+
+    def update(self, barriers=None):
+        if not super().update(barriers):
+            return False
+        self.is_moving = True
         return True
 
-    def reset(self):
-        self.length = 3  # Reset to 3 segments
-        self.positions = [(GRID_WIDTH // 2, GRID_HEIGHT // 2)]
-        # Initialize body segments
-        for i in range(self.length - 1):
-            self.positions.append((GRID_WIDTH // 2 - i - 1, GRID_HEIGHT // 2))
-        self.direction = RIGHT
-        self.score = 0
-        self.animation_step = 0
-        self.next_positions = []
+    def reset(self, start=None):
+        super().reset(start)
         self.is_moving = False
 
-    def get_interpolated_position(self, pos1, pos2, step):
+    def get_interpolated_position(self, pos1, pos2, progress):
         if not self.is_moving:
-            return pos1
+            return pos2
         x1, y1 = pos1
         x2, y2 = pos2
-        progress = step / ANIMATION_STEPS
+        if abs(x2 - x1) > 1 or abs(y2 - y1) > 1:
+            return pos2  # Wrapped round the board edge; no slide across it
         return (x1 + (x2 - x1) * progress, y1 + (y2 - y1) * progress)
 
-    def render(self, surface):
-        for i, p in enumerate(self.positions):
+    def interpolated_head(self, progress=1.0):
+        # Head cell in fractional grid units, as render() draws it
+        if len(self.positions) < 2:
+            return self.positions[0]
+        return self.get_interpolated_position(self.positions[1], self.positions[0], progress)
+
+    def render(self, surface, progress=1.0, offset=(0, 0)):
+        # `progress` is how far (0..1) the time since the last logic tick is
+        # into the next one; segments slide from their previous cells by it.
+        # `offset` is the camera position in world pixels; segments outside
+        # the surface are skipped.
+        rects = []
+        view = surface.get_rect()
+        # Before the last move each segment sat where its successor is now;
+        # the tail came from the cell it left (or stayed put when growing)
+        tail_from = self.last_tail if self.last_tail is not None else self.positions[-1]
+        previous = chain(islice(self.positions, 1, None), (tail_from,))
+        for i, (p, prev) in enumerate(zip(self.positions, previous)):
             # Calculate color gradient for body segments
             if i == 0:
                 color = SNAKE_HEAD_COLOR
@@ -230,22 +453,19 @@ class Snake:
                 )
             
             # Calculate interpolated position for all segments
-            if self.is_moving:
-                if i < len(self.next_positions):
-                    current_pos = self.get_interpolated_position(p, self.next_positions[i], self.animation_step)
-                else:
-                    current_pos = p
-            else:
-                current_pos = p
+            current_pos = self.get_interpolated_position(prev, p, progress)
                 
             # Convert grid position to screen position
-            screen_x = current_pos[0] * GRID_SIZE
-            screen_y = current_pos[1] * GRID_SIZE
+            screen_x = current_pos[0] * GRID_SIZE - offset[0]
+            screen_y = current_pos[1] * GRID_SIZE - offset[1]
             
             # Draw snake segment
             r = pygame.Rect(screen_x, screen_y, GRID_SIZE, GRID_SIZE)
+            if not view.colliderect(r):
+                continue
             pygame.draw.rect(surface, color, r)
             pygame.draw.rect(surface, WHITE, r, 1)
+            rects.append(r)
             
             # Draw eyes for the head
             if i == 0:
@@ -270,61 +490,41 @@ class Snake:
                 # Draw pupils
                 pygame.draw.circle(surface, BLACK, left_eye, eye_size//2)
                 pygame.draw.circle(surface, BLACK, right_eye, eye_size//2)
+        return rects
 
-class Food:
-    def __init__(self):
-        self.position = (0, 0)
-        self.color = FOOD_COLOR
-        # Initialize with default position, will be randomized in main game loop
+class Food(snake_engine.Food):
+    __slots__ = ("color",)
 
-    def randomize_position(self, barriers, snake_positions):
-        while True:
-            self.position = (random.randint(0, GRID_WIDTH-1),
-                           random.randint(0, GRID_HEIGHT-1))
-            # Make sure food doesn't spawn on barriers or snake
-            if not any(self.position == barrier.position for barrier in barriers) and \
-               self.position not in snake_positions:
-                break
+    def __init__(self, grid=None, rng=random):
+        super().__init__(grid, rng)
+        self.color = FOOD_COLOR
 
-    def render(self, surface):
-        r = pygame.Rect((self.position[0] * GRID_SIZE,
-                        self.position[1] * GRID_SIZE),
+    def render(self, surface, offset=(0, 0)):
+        if self.position is None:
+            return None  # Never placed: the board was full
+        r = pygame.Rect((self.position[0] * GRID_SIZE - offset[0],
+                        self.position[1] * GRID_SIZE - offset[1]),
                        (GRID_SIZE, GRID_SIZE))
+        if not surface.get_rect().colliderect(r):
+            return None
         pygame.draw.rect(surface, self.color, r)
         pygame.draw.rect(surface, WHITE, r, 1)
+        return r
 
-class BonusFood:
-    def __init__(self):
-        self.position = None
-        self.color = BONUS_FOOD_COLOR
-        self.active = False
-        self.spawn_time = 0
-        self.duration = 5000  # 5 seconds in milliseconds
-
-    def spawn(self, barriers, snake_positions, food_position):
-        if not self.active and random.random() < BONUS_FOOD_CHANCE:
-            while True:
-                self.position = (random.randint(0, GRID_WIDTH-1),
-                               random.randint(0, GRID_HEIGHT-1))
-                if (not any(self.position == barrier.position for barrier in barriers) and 
-                    self.position not in snake_positions and 
-                    self.position != food_position):
-                    self.active = True
-                    self.spawn_time = pygame.time.get_ticks()
-                    break
+class BonusFood(snake_engine.BonusFood):
+    __slots__ = ("color",)
 
-    def update(self):
-        if self.active:
-            current_time = pygame.time.get_ticks()
-            if current_time - self.spawn_time > self.duration:
-                self.active = False
-                self.position = None
+    def __init__(self, grid=None, clock=pygame.time.get_ticks, rng=random):
+        super().__init__(grid, clock, rng)
+        self.color = BONUS_FOOD_COLOR
 
-    def render(self, surface):
+    def render(self, surface, offset=(0, 0)):
         if self.active:
-            r = pygame.Rect((self.position[0] * GRID_SIZE,
-                           self.position[1] * GRID_SIZE),
+            r = pygame.Rect((self.position[0] * GRID_SIZE - offset[0],
+                           self.position[1] * GRID_SIZE - offset[1]),
                           (GRID_SIZE, GRID_SIZE))
+            if not surface.get_rect().colliderect(r.inflate(4, 4)):
+                return None
             # Draw bonus food with star effect
             pygame.draw.rect(surface, self.color, r)
             pygame.draw.rect(surface, WHITE, r, 1)
@@ -336,108 +536,208 @@ class BonusFood:
                 x = center_x + int(GRID_SIZE/2 * math.cos(math.radians(angle)))
                 y = center_y + int(GRID_SIZE/2 * math.sin(math.radians(angle)))
                 pygame.draw.line(surface, WHITE, (center_x, center_y), (x, y), 2)
+            # The star's thick lines reach a pixel past the cell edge
+            return r.inflate(4, 4)
+        return None
 
-# Directional constants
-UP = (0, -1)
-DOWN = (0, 1)
-LEFT = (-1, 0)
-RIGHT = (1, 0)
-
-def create_barriers(level):
-    barriers = []
-    num_barriers = BASE_NUM_BARRIERS + (level - 1) * 2  # Add 2 more barriers per level
-    
-    # Create walls in different directions
-    for _ in range(num_barriers):
-        # Randomly choose wall direction (horizontal or vertical)
-        is_horizontal = random.choice([True, False])
-        
-        # Choose starting position
-        if is_horizontal:
-            start_x = random.randint(2, GRID_WIDTH - MAX_WALL_LENGTH - 2)
-            start_y = random.randint(2, GRID_HEIGHT - 2)
-            wall_length = random.randint(MIN_WALL_LENGTH, MAX_WALL_LENGTH)
-            
-            # Create horizontal wall
-            for x in range(wall_length):
-                pos = (start_x + x, start_y)
-                # Avoid center area where snake starts
-                if abs(pos[0] - GRID_WIDTH//2) > 3 or abs(pos[1] - GRID_HEIGHT//2) > 3:
-                    barriers.append(Barrier(pos))
+def create_barriers(level, rng=random, width=GRID_WIDTH, height=GRID_HEIGHT):
+    return BarrierField(level_cells(level, rng, width, height), rng)
+
+_background_executor = None
+
+def background_executor():
+    # One worker thread for level generation in every game and for loading
+    # the history
+    global _background_executor
+    if _background_executor is None:
+        _background_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snake-bg")
+    return _background_executor
+
+class LevelPrefetcher:
+    # Builds a game's levels. Each level draws from its own generator,
+    # seeded from the game seed and the level number, so it doesn't depend
+    # on anything played before it; that lets the next level be built on a
+    # worker thread while the current one is played, and level-up just
+    # picks it up.
+    def __init__(self, seed, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.pending = {}  # level -> Future
+
+    def build(self, level):
+        return create_barriers(level, level_rng(self.seed, level), self.width, self.height)
+
+    def prefetch(self, level):
+        if level not in self.pending:
+            self.pending[level] = background_executor().submit(self.build, level)
+
+    def get(self, level):
+        # The level's barriers, then the next level is started in the background
+        future = self.pending.pop(level, None)
+        barriers = future.result() if future is not None else self.build(level)
+        self.prefetch(level + 1)
+        return barriers
+
+    def __deepcopy__(self, memo):
+        # Replay snapshots share it; a level comes out the same whoever asks
+        return self
+
+class GameSession(GameEngine):
+    # Logic state of one game in the window: the GameEngine rules with
+    # drawable pieces. Time only moves through ticks (one snake move each),
+    # so the game runs at the same speed whatever the frame rate. The seed
+    # plus the turns (self.replay) reproduce the game exactly. Levels come
+    # from a LevelPrefetcher, so the next one is built while this one is
+    # played. The board is the window's size unless a larger world is
+    # asked for.
+    snake_type = Snake
+    food_type = Food
+    bonus_type = BonusFood
+
+    def reset(self, seed=None):
+        self.levels = None
+        super().reset(seed)
+        self.replay = Replay(self.seed, width=self.width, height=self.height)
+
+    def build_level(self, level):
+        if self.levels is None:
+            self.levels = LevelPrefetcher(self.seed, self.width, self.height)
+        return self.levels.get(level)
+
+    def turn(self, direction):
+        # Player input; recorded for the replay when the snake accepts it
+        if not super().turn(direction):
+            return False
+        self.replay.record(self.ticks, direction)
+        return True
+
+    def update_snake(self):
+        alive = super().update_snake()
+        self.replay.ticks = self.ticks
+        return alive
+
+class TextCache:
+    # Rendered text surfaces keyed by (font, text, color, background), least
+    # recently used evicted first. Steady-state frames reuse the surfaces, so
+    # only text that actually changed gets rasterized.
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.misses = 0
+
+    def render(self, font, text, color, background=None):
+        key = (font, text, color, background)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = font.render(text, True, color, background)
+            self.misses += 1
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.max_size:
+                self.surfaces.popitem(last=False)
         else:
-            start_x = random.randint(2, GRID_WIDTH - 2)
-            start_y = random.randint(2, GRID_HEIGHT - MAX_WALL_LENGTH - 2)
-            wall_length = random.randint(MIN_WALL_LENGTH, MAX_WALL_LENGTH)
-            
-            # Create vertical wall
-            for y in range(wall_length):
-                pos = (start_x, start_y + y)
-                # Avoid center area where snake starts
-                if abs(pos[0] - GRID_WIDTH//2) > 3 or abs(pos[1] - GRID_HEIGHT//2) > 3:
-                    barriers.append(Barrier(pos))
-    
-    return barriers
+            self.surfaces.move_to_end(key)
+        return surface
+
+text_cache = TextCache()
 
 class Menu:
-    def __init__(self):
+    def __init__(self, writer=None):
         self.font = pygame.font.Font(None, 74)
         self.small_font = pygame.font.Font(None, 36)
         self.options = ["Start Game", "History", "Exit"]
         self.selected = 0
-        self.history = []  # List to store game history
-        self.load_history()
-
-    def load_history(self):
-        try:
-            with open("snake_history.txt", "r") as f:
-                self.history = [line.strip() for line in f.readlines()]
-        except FileNotFoundError:
-            self.history = []
-
-    def save_history(self):
-        with open("snake_history.txt", "w") as f:
-            for entry in self.history:
-                f.write(entry + "\n")
-
-    def add_to_history(self, score, level):
-        timestamp = pygame.time.get_ticks() // 1000  # Convert to seconds
-        entry = f"Score: {score} | Level: {level} | Time: {timestamp}s"
-        self.history.insert(0, entry)
-        if len(self.history) > 10:  # Keep only last 10 entries
-            self.history.pop()
-        self.save_history()
+        self.drawn_selected = None
+        self.option_rects = []
+        self.history_store = HistoryStore()
+        self.writer = writer  # History is written on this thread when given
+        self.history = []  # Lines shown on the history screen, newest game first
+        self.history_summary = ""
+        # Read in the background; the menu shows without waiting for it
+        self.history_loading = background_executor().submit(self.history_store.load)
+
+    def wait_history(self):
+        # The history has to be loaded before it is shown or added to
+        if self.history_loading is not None:
+            self.history_loading.result()
+            self.history_loading = None
+            self.refresh_history()
+
+    def refresh_history(self):
+        store = self.history_store
+        self.history = [self.format_entry(entry) for entry in store.recent()]
+        if store.count():
+            best = store.top(1)[0]["score"]
+            average = store.averages()["score"]
+            self.history_summary = f"Games: {store.count()}  Best: {best}  Average: {average:.1f}"
+        else:
+            self.history_summary = "No games yet"
+
+    def format_entry(self, entry):
+        parts = [f"Score: {entry['score']}", f"Level: {entry['level']}"]
+        if entry["duration"] is not None:
+            minutes, seconds = divmod(int(entry["duration"]), 60)
+            parts.append(f"{minutes}:{seconds:02d}")
+        if entry["cause"]:
+            parts.append(CAUSE_LABELS.get(entry["cause"], entry["cause"]))
+        if entry["time"]:
+            parts.append(time.strftime("%d %b %H:%M", time.localtime(entry["time"])))
+        return " | ".join(parts)
+
+    def add_to_history(self, score, level, length=None, duration=None, seed=None, cause=None,
+                       ticks=None):
+        self.wait_history()
+        entry = make_entry(score, level, length, duration, seed, cause, ticks)
+        self.history_store.append(entry, self.writer)
+        self.refresh_history()
 
     def render(self, surface):
         surface.fill(BLACK)
         
         # Draw title
-        title = self.font.render("Snake Game", True, GREEN)
+        title = text_cache.render(self.font, "Snake Game", GREEN)
         title_rect = title.get_rect(center=(WINDOW_WIDTH//2, 150))
         surface.blit(title, title_rect)
 
         # Draw options
+        self.option_rects = []
         for i, option in enumerate(self.options):
             color = HOVER_COLOR if i == self.selected else WHITE
-            text = self.font.render(option, True, color)
+            text = text_cache.render(self.font, option, color)
             rect = text.get_rect(center=(WINDOW_WIDTH//2, 300 + i * 100))
             surface.blit(text, rect)
+            self.option_rects.append(rect)
+
+        # Only the selection highlight changes between menu frames
+        dirty = []
+        if self.drawn_selected != self.selected:
+            if self.drawn_selected is not None:
+                dirty.append(self.option_rects[self.drawn_selected])
+            dirty.append(self.option_rects[self.selected])
+            self.drawn_selected = self.selected
+        return dirty
 
     def render_history(self, surface):
+        self.wait_history()
         surface.fill(BLACK)
         
         # Draw title
-        title = self.font.render("Game History", True, GREEN)
+        title = text_cache.render(self.font, "Game History", GREEN)
         title_rect = title.get_rect(center=(WINDOW_WIDTH//2, 50))
         surface.blit(title, title_rect)
 
+        # Draw totals
+        summary = text_cache.render(self.small_font, self.history_summary, HOVER_COLOR)
+        surface.blit(summary, summary.get_rect(center=(WINDOW_WIDTH//2, 105)))
+
         # Draw history entries
         for i, entry in enumerate(self.history):
-            text = self.small_font.render(entry, True, WHITE)
+            text = text_cache.render(self.small_font, entry, WHITE)
             rect = text.get_rect(center=(WINDOW_WIDTH//2, 150 + i * 40))
             surface.blit(text, rect)
 
         # Draw back button
-        back_text = self.font.render("Back", True, WHITE)
+        back_text = text_cache.render(self.font, "Back", WHITE)
         back_rect = back_text.get_rect(center=(WINDOW_WIDTH//2, WINDOW_HEIGHT - 100))
         surface.blit(back_text, back_rect)
 
@@ -451,114 +751,330 @@ class Menu:
                 return self.options[self.selected]
         return None
 
-def main():
+class FramePresenter:
+    # Copies the composed frame to the screen. In DIRTY_RECTS mode the
+    # renderers report the rects they drew; every rect drawn last frame is
+    # pushed again so that whatever moved or vanished there is erased too.
+    def __init__(self, mode=FULL_FRAME):
+        self.mode = mode
+        self.rects = []
+        self.last_rects = []
+        self.needs_full = True
+
+    def mark(self, rects):
+        if rects is None:
+            return
+        if isinstance(rects, pygame.Rect):
+            self.rects.append(rects)
+        else:
+            self.rects.extend(rects)
+
+    def invalidate(self):
+        # Next present pushes the whole frame (state change, new level, ...)
+        self.needs_full = True
+
+    def present(self, screen, surface):
+        if self.mode == FULL_FRAME or self.needs_full:
+            screen.blit(surface, (0, 0))
+            pygame.display.update()
+        else:
+            rects = self.last_rects + self.rects
+            for r in rects:
+                screen.blit(surface, r, r)
+            pygame.display.update(rects)
+        self.last_rects = self.rects
+        self.rects = []
+        self.needs_full = False
+
+class ProfilerOverlay:
+    # F3 overlay with FPS, frame/work time percentiles, dropped frames and
+    # the last frame's phase breakdown. Text is refreshed a few times a second.
+    REFRESH_FRAMES = 30
+
+    def __init__(self):
+        self.font = None  # Loaded the first time the overlay is shown
+        self.lines = []
+        self.frames = 0
+
+    def render(self, surface, profiler):
+        if self.font is None:
+            self.font = pygame.font.Font(None, 22)
+        if self.frames % self.REFRESH_FRAMES == 0:
+            stats = profiler.stats()
+            text = [f"FPS {stats['fps']:.1f}  dropped {stats['dropped']}",
+                    f"frame p50 {stats['frame_p50']:.2f}  p99 {stats['frame_p99']:.2f} ms",
+                    f"work p50 {stats['work_p50']:.2f}  p99 {stats['work_p99']:.2f} ms"]
+            text += [f"{name} {ms:.3f} ms" for name, ms in stats["phases"].items()]
+            self.lines = [self.font.render(line, True, YELLOW, BLACK) for line in text]
+        self.frames += 1
+        rects = []
+        for i, line in enumerate(self.lines):
+            rects.append(surface.blit(line, line.get_rect(topright=(WINDOW_WIDTH - 10, 10 + i * 18))))
+        return rects
+
+def save_replay(session, writer, replay_files):
+    # Written next to the history on the writer thread
+    path = replay_path(time.time(), session.seed)
+    writer.submit(replay_files, (path, session.replay.encode()))
+
+def shutdown(profiler, writer):
+    # Pending history writes are finished before the window closes
+    writer.close()
+    profiler.write_trace()
+    pygame.quit()
+    sys.exit()
+
+def main(render_mode=FULL_FRAME, profile=False, trace_path=None, fps=SNAKE_SPEED,
+         fsync=FSYNC_BATCH, replay=None, seek=0, world=(GRID_WIDTH, GRID_HEIGHT), autopilot=False):
+    # Only the subsystems the game uses; pygame.init() would also bring up
+    # audio, joysticks and the rest
+    pygame.display.init()
+    pygame.font.init()
     clock = pygame.time.Clock()
     screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
     pygame.display.set_caption('Snake Game with Menu')
     surface = pygame.Surface(screen.get_size())
     surface = surface.convert()
+    tiles_warm = False  # Barrier tiles are rendered during menu frames, not before the first one
+    presenter = FramePresenter(render_mode)
+    presented_scene = None
+    profiler = FrameProfiler(1000 / (fps or SNAKE_SPEED), trace_path)
+    if profile:
+        profiler.toggle_overlay()
+    profiler_overlay = ProfilerOverlay()
 
-    menu = Menu()
+    writer = BackgroundWriter(fsync)
+    replay_files = ReplayFiles()
+    menu = Menu(writer)
     game_state = MENU
-    snake = None
-    food = None
-    bonus_food = None
-    barriers = None
-    level = 1
+    session = None
+    pilot = None  # Autopilot steering the snake, when it's on
+    player = None  # ReplayPlayer while a replay is shown
+    replay_speed = 0  # Index into REPLAY_SPEEDS
+    replay_paused = False
+    if replay is not None:
+        game_state = REPLAY
+        player = ReplayPlayer(replay, GameSession)
+        player.seek(seek)
+        session = player.session
+    barrier_layer = None
+    camera = Camera(screen.get_size())
+    accumulator = 0.0  # Milliseconds of game time not yet simulated
+    animation_ms = 0.0  # Milliseconds not yet turned into wall animation steps
+    last_frame = time.perf_counter()
 
     while True:
+        profiler.begin_frame()
+        now = time.perf_counter()
+        frame_ms = min((now - last_frame) * 1000, MAX_FRAME_MS)
+        last_frame = now
+
+        # Input is sampled every frame, several times per logic tick; turns
+        # queue up on the snake and are applied one per move
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                shutdown(profiler, writer)
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle_overlay()
+                presenter.invalidate()
+                continue
             
             if game_state == MENU:
                 selected = menu.handle_event(event)
                 if selected == "Start Game":
                     game_state = PLAYING
-                    snake = Snake()
-                    food = Food()
-                    bonus_food = BonusFood()
-                    level = 1
-                    barriers = create_barriers(level)
-                    food.randomize_position(barriers, snake.positions)
+                    session = GameSession(width=world[0], height=world[1])
+                    pilot = Autopilot() if autopilot else None
+                    accumulator = 0.0
                 elif selected == "History":
                     game_state = HISTORY
                 elif selected == "Exit":
-                    pygame.quit()
-                    sys.exit()
+                    shutdown(profiler, writer)
             
             elif game_state == PLAYING:
                 if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_UP and snake.direction != DOWN:
-                        snake.direction = UP
-                    elif event.key == pygame.K_DOWN and snake.direction != UP:
-                        snake.direction = DOWN
-                    elif event.key == pygame.K_LEFT and snake.direction != RIGHT:
-                        snake.direction = LEFT
-                    elif event.key == pygame.K_RIGHT and snake.direction != LEFT:
-                        snake.direction = RIGHT
+                    if event.key == pygame.K_F2:
+                        # Also sticks for the next games
+                        autopilot = not autopilot
+                        pilot = Autopilot() if autopilot else None
+                    elif pilot is not None and event.key != pygame.K_ESCAPE:
+                        pass  # The arrow keys are ignored while the autopilot steers
+                    elif event.key == pygame.K_UP:
+                        session.turn(UP)
+                    elif event.key == pygame.K_DOWN:
+                        session.turn(DOWN)
+                    elif event.key == pygame.K_LEFT:
+                        session.turn(LEFT)
+                    elif event.key == pygame.K_RIGHT:
+                        session.turn(RIGHT)
+                    elif event.key == pygame.K_ESCAPE:
+                        game_state = MENU
+
+            elif game_state == REPLAY:
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_SPACE:
+                        replay_paused = not replay_paused
+                    elif event.key == pygame.K_TAB:
+                        replay_speed = (replay_speed + 1) % len(REPLAY_SPEEDS)
+                    elif event.key == pygame.K_LEFT:
+                        player.seek(player.tick - REPLAY_SEEK_TICKS)
+                    elif event.key == pygame.K_RIGHT:
+                        player.seek(player.tick + REPLAY_SEEK_TICKS)
+                    elif event.key == pygame.K_HOME:
+                        player.seek(0)
+                    elif event.key == pygame.K_END:
+                        player.seek(player.replay.ticks)
                     elif event.key == pygame.K_ESCAPE:
                         game_state = MENU
+                    accumulator = 0.0
+                    session = player.session
             
             elif game_state == HISTORY:
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE or event.key == pygame.K_RETURN:
                         game_state = MENU
+        profiler.mark(EVENTS)
 
-        # Update game state
+        # Update game state: as many fixed logic ticks as the elapsed time holds
         if game_state == PLAYING:
-            # Update snake
-            if not snake.update(barriers):
-                menu.add_to_history(snake.score, level)
-                game_state = MENU
-
-            # Check if snake ate the food
-            if snake.get_head_position() == food.position:
-                snake.length += 1
-                snake.score += 1
-                food.randomize_position(barriers, snake.positions)
-                bonus_food.spawn(barriers, snake.positions, food.position)
-                
-                # Check for level up
-                if snake.length % 10 == 0:
-                    level += 1
-                    barriers = create_barriers(level)
+            accumulator += frame_ms
+            while accumulator >= LOGIC_TICK_MS:
+                accumulator -= LOGIC_TICK_MS
+                if pilot is not None:
+                    # Steered like a player would, so the replay records it
+                    snake = session.snake
+                    direction = pilot.choose(session.grid, snake.positions,
+                                             session.food.position, snake.length)
+                    if direction is not None:
+                        session.turn(direction)
+                alive = session.update_snake()
+                profiler.mark(SNAKE_UPDATE)
+                if alive:
+                    alive = session.update_food()
+                    profiler.mark(FOOD_BONUS)
+                if not alive:
+                    snake = session.snake
+                    menu.add_to_history(snake.score, session.level, snake.length,
+                                        session.now() / 1000, session.seed, session.cause,
+                                        session.ticks)
+                    save_replay(session, writer, replay_files)
+                    game_state = MENU
+                    break
+        elif game_state == REPLAY:
+            # Same fixed ticks, REPLAY_SPEEDS times as many per real second;
+            # the last frame stays up once the replay ends
+            if not replay_paused and not player.finished:
+                accumulator += frame_ms * REPLAY_SPEEDS[replay_speed]
+                while accumulator >= LOGIC_TICK_MS:
+                    accumulator -= LOGIC_TICK_MS
+                    if not player.step():
+                        break
+                profiler.mark(SNAKE_UPDATE)
+            if player.finished:
+                accumulator = 0.0
+            session = player.session
+        in_game = game_state in (PLAYING, REPLAY)
+        if in_game and (barrier_layer is None or barrier_layer.barriers is not session.barriers):
+            barrier_layer = make_barrier_layer(session.barriers, session.width, session.height)
 
-            # Check if snake ate the bonus food
-            if bonus_food.active and snake.get_head_position() == bonus_food.position:
-                snake.score += BONUS_FOOD_POINTS
-                bonus_food.active = False
-                bonus_food.position = None
+        # A new screen or a new barrier background changes the whole frame
+        scene = (game_state, barrier_layer if in_game else None)
+        if scene != presented_scene:
+            presenter.invalidate()
+            presented_scene = scene
+        progress = accumulator / LOGIC_TICK_MS
+        if in_game:
+            # A scrolled view changes the whole frame too
+            offset = camera.follow(session.snake.interpolated_head(progress),
+                                   (session.width, session.height))
+            if camera.moved:
+                presenter.invalidate()
 
-            # Update bonus food
-            bonus_food.update()
+        if in_game:
+            # The walls animate at the same pace at any frame rate, and catch
+            # up after a stall instead of freezing
+            animation_ms += frame_ms
+            steps = int(animation_ms // BARRIER_ANIMATION_STEP_MS)
+            animation_ms -= steps * BARRIER_ANIMATION_STEP_MS
+            session.barriers.animate(steps)
 
         # Draw everything
-        surface.fill(BLACK)
-        
         if game_state == MENU:
-            menu.render(surface)
-        elif game_state == PLAYING:
-            # Draw barriers first
-            for barrier in barriers:
-                barrier.render(surface)
-                
-            snake.render(surface)
-            food.render(surface)
-            bonus_food.render(surface)
+            presenter.mark(menu.render(surface))
+            if not tiles_warm:
+                # Whatever is left when a game starts is rendered on demand
+                tiles_warm = barrier_tiles.prerender(limit=TILE_WARMUP_PER_FRAME)
+        elif in_game:
+            # Barrier layer first; it also clears the frame
+            presenter.mark(barrier_layer.render(surface, offset))
+            profiler.mark(BARRIER_RENDER)
+
+            # Interpolate by how far we are into the next logic tick
+            presenter.mark(session.snake.render(surface, progress, offset))
+            presenter.mark(session.food.render(surface, offset))
+            presenter.mark(session.bonus_food.render(surface, offset))
+            profiler.mark(SNAKE_RENDER)
             
             # Draw score and level
-            score_text = menu.small_font.render(f'Score: {snake.score}', True, WHITE)
-            level_text = menu.small_font.render(f'Level: {level}', True, WHITE)
-            surface.blit(score_text, (10, 10))
-            surface.blit(level_text, (10, 50))
+            score_text = text_cache.render(menu.small_font, f'Score: {session.snake.score}', WHITE)
+            level_text = text_cache.render(menu.small_font, f'Level: {session.level}', WHITE)
+            presenter.mark(surface.blit(score_text, (10, 10)))
+            presenter.mark(surface.blit(level_text, (10, 50)))
+            if game_state == REPLAY:
+                status = "paused" if replay_paused else f"{REPLAY_SPEEDS[replay_speed]}x"
+                replay_text = text_cache.render(
+                    menu.small_font, f'Replay {player.tick}/{player.replay.ticks}  {status}', WHITE)
+                presenter.mark(surface.blit(replay_text, (10, 90)))
+            elif pilot is not None:
+                presenter.mark(surface.blit(
+                    text_cache.render(menu.small_font, 'Autopilot', WHITE), (10, 90)))
         elif game_state == HISTORY:
             menu.render_history(surface)
+        if profiler.show_overlay:
+            presenter.mark(profiler_overlay.render(surface, profiler))
+        profiler.mark(HUD_RENDER)
+
+        presenter.present(screen, surface)
+        profiler.mark(DISPLAY_FLIP)
+        profiler.end_frame()
+        clock.tick(fps)
+
+def parse_world(text):
+    try:
+        width, height = (int(n) for n in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}")
+    if width < GRID_WIDTH or height < GRID_HEIGHT:
+        raise argparse.ArgumentTypeError(f"the board must be at least {GRID_WIDTH}x{GRID_HEIGHT}")
+    return (width, height)
 
-        screen.blit(surface, (0, 0))
-        pygame.display.update()
-        clock.tick(SNAKE_SPEED)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Snake Game")
+    parser.add_argument("--render-mode", choices=[FULL_FRAME, DIRTY_RECTS], default=FULL_FRAME,
+                        help="push the whole window every frame or only the changed rects")
+    parser.add_argument("--fps", type=int, default=SNAKE_SPEED,
+                        help="render frame rate cap, 0 for uncapped; game speed is unaffected")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default=FSYNC_BATCH,
+                        help="when history writes are forced to disk: every batch, only on exit, or never")
+    parser.add_argument("--profile", action="store_true",
+                        help="start with the frame-time overlay shown (toggle with F3)")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="record per-frame phase timings to a .csv or .json file")
+    parser.add_argument("--world", type=parse_world, default=(GRID_WIDTH, GRID_HEIGHT),
+                        metavar="WxH", help="board size in cells, e.g. 1000x1000; "
+                        "boards larger than the window scroll with the snake")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="play back a recorded game (replays/*.snkr)")
+    parser.add_argument("--seek", type=int, default=0, metavar="TICK",
+                        help="start the replay at this logic tick")
+    parser.add_argument("--autopilot", action="store_true",
+                        help="let the path-finding autopilot play (toggle with F2)")
+    return parser.parse_args(argv)
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    args = parse_args()
+    replay = Replay.load(args.replay) if args.replay else None
+    main(render_mode=args.render_mode, profile=args.profile, trace_path=args.trace, fps=args.fps,
+         fsync=args.fsync, replay=replay, seek=args.seek, world=args.world,
+         autopilot=args.autopilot) 
\ No newline at end of file
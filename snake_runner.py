@@ -0,0 +1,186 @@
+# Headless self-play / evaluation runner. Plays many GameEngine games across
+# all CPU cores with a process pool, streams each game's result back to the
+# parent as it finishes and prints an aggregate summary. Results only depend
+# on the seed list and the policy, never on worker count or scheduling.
+#
+#   python snake_runner.py --games 1000 --policy greedy
+#   python snake_runner.py --seeds 3,7,11 --policy random --output results.jsonl
+#   python snake_runner.py --games 100 --policy autopilot --max-ticks 20000
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from snake_engine import (GRID_WIDTH, GRID_HEIGHT, UP, DOWN, LEFT, RIGHT, BARRIER_CELL,
+                          GameEngine)
+from autopilot import Autopilot
+
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+
+# Games handed to a worker per task; amortizes pickling and scheduling
+DEFAULT_CHUNK_SIZE = 8
+DEFAULT_MAX_TICKS = 100000
+TICK_LIMIT = "tick_limit"  # Reported as the cause when a game hits max_ticks
+
+def is_safe(engine, direction):
+    # Would moving in `direction` survive this tick? Same test as GameEngine.step
+    head = engine.positions[0]
+    x = (head[0] + direction[0]) % GRID_WIDTH
+    y = (head[1] + direction[1]) % GRID_HEIGHT
+    i = GRID_WIDTH * y + x
+    if engine.grid.cells[i] & BARRIER_CELL:
+        return False
+    positions = engine.positions
+    head_hits = (positions[0] == (x, y)) + (positions[1] == (x, y)) + (positions[2] == (x, y))
+    return engine.grid.snake[i] <= head_hits
+
+def legal_directions(engine):
+    dx, dy = engine.direction
+    return [d for d in DIRECTIONS if d != (-dx, -dy)]
+
+def random_policy(engine, rng):
+    # Turn at random now and then, preferring moves that survive
+    if rng.random() < 0.1:
+        choices = [d for d in legal_directions(engine) if is_safe(engine, d)]
+        if choices:
+            return rng.choice(choices)
+    return None
+
+def torus_distance(a, b):
+    dx = abs(a[0] - b[0])
+    dy = abs(a[1] - b[1])
+    return min(dx, GRID_WIDTH - dx) + min(dy, GRID_HEIGHT - dy)
+
+def greedy_policy(engine, rng):
+    # Safe move that gets closest to the food on the wrapped board
+    head = engine.positions[0]
+    best = None
+    best_distance = None
+    for d in legal_directions(engine):
+        if not is_safe(engine, d):
+            continue
+        cell = ((head[0] + d[0]) % GRID_WIDTH, (head[1] + d[1]) % GRID_HEIGHT)
+        distance = torus_distance(cell, engine.food_position)
+        if best is None or distance < best_distance:
+            best, best_distance = d, distance
+    return best
+
+class AutopilotPolicy:
+    # Path-finding autopilot; it keeps its plan between moves, so each game
+    # gets its own
+    def __init__(self):
+        self.pilot = Autopilot()
+
+    def __call__(self, engine, rng):
+        return self.pilot.choose(engine.grid, engine.positions, engine.food_position, engine.length)
+
+# Plain functions are shared; classes are stateful and built once per game
+POLICIES = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+    "autopilot": AutopilotPolicy,
+}
+
+def play_game(seed, policy="greedy", max_ticks=DEFAULT_MAX_TICKS):
+    # One game from `seed`; the policy gets its own RNG derived from the seed
+    engine = GameEngine(seed=seed)
+    rng = random.Random(f"policy-{seed}")
+    choose = POLICIES[policy]
+    if isinstance(choose, type):
+        choose = choose()
+    while engine.ticks < max_ticks and engine.step(choose(engine, rng)):
+        pass
+    return {
+        "seed": seed,
+        "policy": policy,
+        "score": engine.score,
+        "level": engine.level,
+        "length": engine.length,
+        "ticks": engine.ticks,
+        "cause": engine.cause if not engine.alive else TICK_LIMIT,
+    }
+
+def play_games(seeds, policy="greedy", max_ticks=DEFAULT_MAX_TICKS):
+    return [play_game(seed, policy, max_ticks) for seed in seeds]
+
+def run(seeds, policy="greedy", workers=None, max_ticks=DEFAULT_MAX_TICKS,
+        chunk_size=DEFAULT_CHUNK_SIZE):
+    # Yields one result dict per seed, in completion order
+    seeds = list(seeds)
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+    if workers == 1:
+        for chunk in chunks:
+            yield from play_games(chunk, policy, max_ticks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(play_games, chunk, policy, max_ticks) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+def summarize(results):
+    results = sorted(results, key=lambda r: r["seed"])
+    count = len(results)
+    if not count:
+        return {"games": 0}
+    scores = [r["score"] for r in results]
+    causes = {}
+    levels = {}
+    for r in results:
+        causes[str(r["cause"])] = causes.get(str(r["cause"]), 0) + 1
+        levels[r["level"]] = levels.get(r["level"], 0) + 1
+    return {
+        "games": count,
+        "mean_score": sum(scores) / count,
+        "min_score": min(scores),
+        "max_score": max(scores),
+        "mean_length": sum(r["length"] for r in results) / count,
+        "mean_ticks": sum(r["ticks"] for r in results) / count,
+        "total_ticks": sum(r["ticks"] for r in results),
+        "levels": dict(sorted(levels.items())),
+        "causes": causes,
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Play headless Snake games on all cores")
+    parser.add_argument("--games", type=int, default=100, help="number of games (seeds start..start+games-1)")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--seeds", help="comma separated seed list, overrides --games/--seed")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="greedy")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--max-ticks", type=int, default=DEFAULT_MAX_TICKS, help="stop a game after this many moves")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="games per worker task")
+    parser.add_argument("--output", help="write per-game results as JSON lines, sorted by seed")
+    parser.add_argument("--quiet", action="store_true", help="don't print each game as it finishes")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.seeds:
+        seeds = [int(s) for s in args.seeds.split(",")]
+    else:
+        seeds = range(args.seed, args.seed + args.games)
+
+    results = []
+    start = time.perf_counter()
+    for result in run(seeds, args.policy, args.workers, args.max_ticks, args.chunk_size):
+        results.append(result)
+        if not args.quiet:
+            print(f"seed {result['seed']}: score {result['score']} level {result['level']} "
+                  f"length {result['length']} ticks {result['ticks']} ({result['cause']})")
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(results)
+    summary["seconds"] = round(elapsed, 3)
+    summary["ticks_per_second"] = round(summary.get("total_ticks", 0) / elapsed) if elapsed else None
+    if args.output:
+        with open(args.output, "w") as f:
+            for result in sorted(results, key=lambda r: r["seed"]):
+                f.write(json.dumps(result) + "\n")
+    json.dump(summary, sys.stdout, indent=2)
+    print()
+
+if __name__ == '__main__':
+    main()
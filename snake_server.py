@@ -0,0 +1,295 @@
+# Local multiplayer server. One asyncio process runs the authoritative game,
+# many snakes on one board built from the single-player rules in
+# snake_engine (Snake, Food, BonusFood, level_cells, all sharing one
+# OccupancyGrid), and talks to clients over TCP; see net_protocol.py for the
+# messages. Doesn't import pygame, so it needs no display.
+#
+# Every tick the turns that arrived since the last one are applied, every
+# snake moves, and one delta message is built and written to all clients.
+# Running into another snake counts like running into yourself. A dead
+# snake respawns after RESPAWN_TICKS. A client that stops reading is dropped
+# rather than buffered for without limit.
+#
+#   python snake_server.py --port 5555
+#   python snake_bot.py --port 5555 --bots 100
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import deque
+
+from snake_engine import (BONUS_FOOD_POINTS, FOOD_CELL, MOVE_INTERVAL_MS, BonusFood, Food,
+                          OccupancyGrid, Snake, level_cells, level_rng, start_positions)
+from frame_profiler import percentile
+from net_protocol import (DEFAULT_HOST, DEFAULT_PORT, DIRECTION_INDEX, DIRECTIONS, encode_tick,
+                          encode_welcome, frame)
+
+DEFAULT_WIDTH = 160  # Cells; room for a hundred snakes
+DEFAULT_HEIGHT = 120
+DEFAULT_LEVEL = 5
+DEFAULT_FOOD = 40  # Food items on the board at once
+RESPAWN_TICKS = 10
+SPAWN_ATTEMPTS = 20  # Random cells tried per tick for a respawn
+SPAWN_CLEARANCE = 3  # Free cells needed ahead of a new head
+READ_SIZE = 256
+MAX_CLIENT_BACKLOG = 64 * 1024  # Unsent bytes before a client counts as stuck
+STATS_TICKS = 1000  # Ticks kept for the timing percentiles
+
+class MultiplayerWorld:
+    # The authoritative game. Players join and leave between ticks; tick()
+    # advances everything one move and returns the encoded delta.
+    def __init__(self, seed=None, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT,
+                 level=DEFAULT_LEVEL, food=DEFAULT_FOOD):
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.width = width
+        self.height = height
+        self.ticks = 0
+        self.grid = OccupancyGrid(width, height)
+        # Same walls as the single-player level for this seed
+        self.barriers = level_cells(level, level_rng(self.seed, level), width, height)
+        self.grid.set_barrier_cells(self.barriers)
+        self.snakes = {}  # Player id -> Snake, for players in play
+        self.respawns = {}  # Player id -> tick to spawn at, for the rest
+        self.next_player = 0
+        # Changes since the last tick() that aren't moves
+        self.removals = []
+        self.items_gone = []
+        self.items_added = []
+        self.scores = {}
+        self.foods = {}  # Cell -> Food
+        for _ in range(food):
+            self._place_food(Food(self.grid, self.rng))
+        self.items_added = []  # Clients get the first food in their welcome
+        self.bonus_food = BonusFood(self.grid, clock=self.now, rng=self.rng)
+
+    def now(self):
+        # Game time in milliseconds
+        return self.ticks * MOVE_INTERVAL_MS
+
+    def cell(self, pos):
+        return pos[1] * self.width + pos[0]
+
+    def join(self):
+        player = self.next_player
+        self.next_player += 1
+        self.respawns[player] = self.ticks + 1
+        return player
+
+    def leave(self, player):
+        self.respawns.pop(player, None)
+        if player in self.snakes:
+            self._remove(player)
+
+    def turn(self, player, direction):
+        snake = self.snakes.get(player)
+        if snake is not None:
+            snake.queue_direction(direction)
+
+    def welcome(self, player):
+        snakes = [(player_id, snake.score, [self.cell(p) for p in snake.positions])
+                  for player_id, snake in self.snakes.items()]
+        items = [self.cell(p) << 1 for p in self.foods]
+        if self.bonus_food.active:
+            items.append(self.cell(self.bonus_food.position) << 1 | 1)
+        walls = {self.cell(p) for p in self.barriers}
+        return encode_welcome(player, self.width, self.height, self.ticks, walls, snakes, items)
+
+    def tick(self):
+        self.ticks += 1
+        grid = self.grid
+        moves = []
+        for player, snake in list(self.snakes.items()):
+            if not snake.update():
+                self._remove(player)
+                self.respawns[player] = self.ticks + RESPAWN_TICKS
+                continue
+            moves.append((player, snake.last_tail is None, DIRECTION_INDEX[snake.direction]))
+            head = snake.positions[0]
+            if grid.cells[self.cell(head)] & FOOD_CELL:
+                self._eat(player, snake, head)
+            if self.bonus_food.active and head == self.bonus_food.position:
+                snake.score += BONUS_FOOD_POINTS
+                self.scores[player] = snake.score
+                self._item_gone(self.cell(head) << 1 | 1)
+                self.bonus_food.collect()
+        bonus = self.bonus_food.position
+        self.bonus_food.update()
+        if bonus is not None and not self.bonus_food.active:
+            self._item_gone(self.cell(bonus) << 1 | 1)
+
+        spawns = []
+        for player, at in list(self.respawns.items()):
+            if at <= self.ticks:
+                snake = self._spawn()
+                if snake is not None:
+                    del self.respawns[player]
+                    self.snakes[player] = snake
+                    spawns.append((player, [self.cell(p) for p in snake.positions]))
+
+        message = encode_tick(self.ticks, moves, self.removals, spawns, list(self.scores.items()),
+                              self.items_gone, self.items_added)
+        self.removals = []
+        self.items_gone = []
+        self.items_added = []
+        self.scores = {}
+        return message
+
+    def _eat(self, player, snake, head):
+        food = self.foods.pop(head)
+        snake.length += 1
+        snake.score += 1
+        self.scores[player] = snake.score
+        self._item_gone(self.cell(head) << 1)
+        self._place_food(food)
+        if not self.bonus_food.active:
+            self.bonus_food.spawn()
+            if self.bonus_food.active:
+                self.items_added.append(self.cell(self.bonus_food.position) << 1 | 1)
+
+    def _item_gone(self, item):
+        # Clients apply gone before added, so an item that came and went
+        # within this tick must not be sent at all
+        if item in self.items_added:
+            self.items_added.remove(item)
+        else:
+            self.items_gone.append(item)
+
+    def _place_food(self, food):
+        # A full board just has one food item fewer
+        if food.randomize_position():
+            self.foods[food.position] = food
+            self.items_added.append(self.cell(food.position) << 1)
+
+    def _spawn(self):
+        # A new snake on a free row with room ahead of it, or None if none
+        # turned up this tick
+        grid = self.grid
+        for _ in range(SPAWN_ATTEMPTS):
+            head = grid.random_free_cell(self.rng)
+            if head is None:
+                return None
+            ahead = ((head[0] + SPAWN_CLEARANCE) % self.width, head[1])
+            if all(grid.is_free(p) for p in start_positions(grid, 3 + SPAWN_CLEARANCE, ahead)):
+                return Snake(grid, head)
+        return None
+
+    def _remove(self, player):
+        snake = self.snakes.pop(player)
+        for p in snake.positions:
+            self.grid.remove_snake(p)
+        self.removals.append(player)
+
+class SnakeServer:
+    def __init__(self, world, tick_ms=MOVE_INTERVAL_MS):
+        self.world = world
+        self.tick_ms = tick_ms
+        self.clients = {}  # Player id -> StreamWriter
+        self.work_ms = deque(maxlen=STATS_TICKS)  # Simulate, encode and write, per tick
+        self.late_ms = deque(maxlen=STATS_TICKS)  # How far past its time each tick started
+        self.bytes_per_tick = deque(maxlen=STATS_TICKS)
+        self.peak_clients = 0
+        self.dropped = 0
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, duration=None):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await self.run_ticks(duration)
+            for player in list(self.clients):
+                self.drop(player)
+
+    async def handle_client(self, reader, writer):
+        player = self.world.join()
+        self.clients[player] = writer
+        self.peak_clients = max(self.peak_clients, len(self.clients))
+        writer.write(frame(self.world.welcome(player)))
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                for byte in data:
+                    if byte < len(DIRECTIONS):
+                        self.world.turn(player, DIRECTIONS[byte])
+        except ConnectionError:
+            pass
+        finally:
+            self.drop(player)
+
+    def drop(self, player):
+        writer = self.clients.pop(player, None)
+        if writer is not None:
+            self.world.leave(player)
+            writer.close()
+
+    async def run_ticks(self, duration=None):
+        loop = asyncio.get_running_loop()
+        interval = self.tick_ms / 1000
+        start = next_tick = loop.time()
+        while duration is None or next_tick - start < duration:
+            next_tick += interval
+            # Input handlers run while we wait
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+            late = loop.time() - next_tick
+            self.late_ms.append(late * 1000)
+            if late > interval:
+                next_tick = loop.time()  # Fell behind; carry on from now instead of bursting
+
+            work_start = time.perf_counter()
+            message = frame(self.world.tick())
+            for player, writer in list(self.clients.items()):
+                if writer.transport.get_write_buffer_size() > MAX_CLIENT_BACKLOG:
+                    self.dropped += 1
+                    self.drop(player)
+                else:
+                    writer.write(message)
+            self.work_ms.append((time.perf_counter() - work_start) * 1000)
+            self.bytes_per_tick.append(len(message))
+
+    def stats(self):
+        work = sorted(self.work_ms)
+        late = sorted(self.late_ms)
+        return {
+            "ticks": self.world.ticks,
+            "clients": len(self.clients),
+            "peak_clients": self.peak_clients,
+            "snakes": len(self.world.snakes),
+            "dropped": self.dropped,
+            "work_p50": percentile(work, 0.50),
+            "work_p99": percentile(work, 0.99),
+            "work_max": work[-1] if work else 0.0,
+            "late_p99": percentile(late, 0.99),
+            "late_max": late[-1] if late else 0.0,
+            "bytes_per_tick": sum(self.bytes_per_tick) / len(self.bytes_per_tick) if self.bytes_per_tick else 0.0,
+        }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Snake multiplayer server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--seed", type=int, help="world seed (random by default)")
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH, help="board width in cells")
+    parser.add_argument("--height", type=int, default=DEFAULT_HEIGHT, help="board height in cells")
+    parser.add_argument("--level", type=int, default=DEFAULT_LEVEL, help="wall layout to play on")
+    parser.add_argument("--food", type=int, default=DEFAULT_FOOD, help="food items on the board")
+    parser.add_argument("--tick-ms", type=float, default=MOVE_INTERVAL_MS, help="milliseconds per tick")
+    parser.add_argument("--duration", type=float, metavar="SECONDS",
+                        help="stop after this long and print stats as JSON")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    world = MultiplayerWorld(args.seed, args.width, args.height, args.level, args.food)
+    server = SnakeServer(world, args.tick_ms)
+    print(f"Serving on {args.host}:{args.port}", file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.duration))
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(server.stats()))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# BackgroundWriter hands each target its items in submission order, writes
+# everything before flush() or close() return, and keeps going when a
+# target fails.
+#
+#   python -m pytest tests
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from background_writer import FSYNC_BATCH, FSYNC_CLOSE, BackgroundWriter
+
+class Target:
+    # Records what it is given; `gate`, when set up, holds every write until
+    # it opens, and `fail` makes writes of those items raise
+    def __init__(self, gate=None, fail=()):
+        self.gate = gate
+        self.fail = set(fail)
+        self.items = []
+        self.batches = []  # (batch size, fsync) per write_batch() call
+        self.syncs = 0
+
+    def write_batch(self, items, fsync=True):
+        if self.gate is not None:
+            self.gate.wait()
+        self.batches.append((len(items), fsync))
+        if self.fail.intersection(items):
+            raise OSError("disk full")
+        self.items.extend(items)
+
+    def sync(self):
+        self.syncs += 1
+
+def test_flush_writes_everything_in_order():
+    writer = BackgroundWriter(FSYNC_BATCH, batch_size=16)
+    a, b = Target(), Target()
+    for i in range(500):
+        writer.submit(a if i % 3 else b, i)
+    writer.flush()
+    assert a.items == [i for i in range(500) if i % 3]
+    assert b.items == [i for i in range(500) if not i % 3]
+    assert all(size <= 16 and fsync for size, fsync in a.batches + b.batches)
+    # Later items still come after the flushed ones
+    writer.submit(a, 500)
+    writer.flush()
+    assert a.items[-2:] == [499, 500]
+    writer.close()
+
+def test_close_drains_the_queue():
+    gate = threading.Event()
+    target = Target(gate)
+    writer = BackgroundWriter(FSYNC_CLOSE, batch_size=8)
+    # The worker sits in the first write while the queue fills up behind it
+    for i in range(100):
+        writer.submit(target, i)
+    gate.set()
+    writer.close()
+    assert target.items == list(range(100))
+    assert not any(fsync for _, fsync in target.batches)
+    assert target.syncs == 1  # FSYNC_CLOSE syncs once, on the closing flush
+    assert not writer.thread.is_alive()
+    with pytest.raises(RuntimeError):
+        writer.submit(target, 100)
+    writer.flush()
+    writer.close()
+
+def test_failing_target(capsys):
+    writer = BackgroundWriter(FSYNC_BATCH)
+    gate = threading.Event()
+    bad, good = Target(gate, fail={3}), Target(gate)
+    # Held at the gate so the failing items and the good ones share a batch
+    for i in range(6):
+        writer.submit(bad, i)
+        writer.submit(good, i)
+    gate.set()
+    writer.flush()
+    assert good.items == list(range(6))
+    assert "Background write failed: OSError('disk full')" in capsys.readouterr().err
+    # The worker is still running, and the failed target gets its next writes
+    writer.submit(bad, 6)
+    writer.submit(good, 6)
+    writer.flush()
+    assert bad.items[-1] == 6
+    assert good.items == list(range(7))
+    writer.close()
@@ -0,0 +1,54 @@
+# The window, the headless engine, the server and the batch env share one
+# set of rules from snake_engine.
+#
+#   python -m pytest tests
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from autopilot import Autopilot
+from batch_env import START_CELL, BatchSnakeEnv
+from snake_engine import GRID_HEIGHT, GRID_WIDTH, GameEngine, open_sealed_regions
+
+TICKS = 3000
+
+def state(game):
+    return (game.positions[0], game.length, game.score, game.food_position,
+            game.bonus_position, game.level, game.cause)
+
+def test_session_plays_the_engine_game():
+    # Same seed, same turns: same game in the window and headless
+    from snake_game import GameSession
+    for seed in range(3):
+        engine = GameEngine(seed)
+        session = GameSession(seed)
+        pilot = Autopilot()
+        while engine.ticks < TICKS:
+            direction = pilot.choose(engine.grid, engine.positions, engine.food_position,
+                                     engine.length)
+            alive = engine.step(direction)
+            assert session.step(direction) == alive
+            assert state(session) == state(engine)
+            if not alive:
+                break
+        assert session.replay.ticks == engine.ticks
+
+def test_server_needs_no_pygame():
+    code = "import sys, snake_server; sys.exit('pygame' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], cwd=ROOT).returncode == 0
+
+def test_batch_walls_seal_nothing():
+    env = BatchSnakeEnv(300, seed=0)
+    games = np.arange(env.num_envs)
+    for level in range(1, 11):
+        env.level[:] = level
+        env.barrier[:] = False
+        env._build_walls(games)
+        for g in games:
+            walls = bytearray(env.barrier[g].view(np.uint8))
+            assert not open_sealed_regions(walls, GRID_WIDTH, GRID_HEIGHT, START_CELL)
@@ -0,0 +1,85 @@
+# HistoryStore recovery: whatever state a crash leaves the log and the index
+# in, load() must come back with the summary of exactly the whole records
+# in the log.
+#
+#   python -m pytest tests
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from history_store import INDEX_FILE, LEGACY_FILE, LOG_FILE, HistoryStore, make_entry
+
+GAMES = 25  # More than TOP_SIZE and RECENT_SIZE, so both lists are cut
+
+def game(i):
+    return make_entry(score=i * 7 % 31, level=1 + i % 4, length=3 + i, duration=10.0 + i,
+                      seed=i, cause="self", ticks=50 * i, timestamp=1_700_000_000 + i)
+
+def play(directory, games):
+    store = HistoryStore(directory).load()
+    for i in games:
+        store.append(game(i))
+    return store
+
+def loaded(directory):
+    return HistoryStore(directory).load().summary
+
+def test_torn_last_line_is_cut(tmp_path):
+    expected = play(tmp_path, range(GAMES)).summary
+    log = tmp_path / LOG_FILE
+    whole = log.read_bytes()
+    with open(log, "ab") as f:
+        f.write(json.dumps(game(GAMES)).encode()[:20])  # Crash mid-write
+    assert loaded(tmp_path) == expected
+    assert log.read_bytes() == whole
+    # The next game lands on a line of its own
+    store = HistoryStore(tmp_path).load()
+    store.append(game(GAMES))
+    assert [e["seed"] for e in store.entries()] == list(range(GAMES + 1))
+
+def test_tail_past_the_index_is_replayed(tmp_path):
+    play(tmp_path, range(10))
+    index = tmp_path / INDEX_FILE
+    stale = index.read_text()
+    expected = play(tmp_path, range(10, GAMES)).summary
+    index.write_text(stale)  # Crash after the log writes, before the index
+    assert loaded(tmp_path) == expected
+    # The index was brought up to date
+    assert json.loads(index.read_text()) == expected
+
+def test_bad_or_missing_index_is_rebuilt(tmp_path):
+    expected = play(tmp_path, range(GAMES)).summary
+    index = tmp_path / INDEX_FILE
+    log = tmp_path / LOG_FILE
+    for damage in ("", "{\"version\": 1, \"cou", "[]", json.dumps(dict(expected, version=0))):
+        index.write_text(damage)
+        assert loaded(tmp_path) == expected
+    index.unlink()
+    assert loaded(tmp_path) == expected
+
+    # An index covering more log than there is (the log lost its last
+    # records) is thrown away too
+    lines = log.read_bytes().splitlines(keepends=True)
+    log.write_bytes(b"".join(lines[:-3]))
+    (tmp_path / "fresh").mkdir()
+    assert loaded(tmp_path) == play(tmp_path / "fresh", range(GAMES - 3)).summary
+
+def test_legacy_history_is_migrated_once(tmp_path):
+    # Newest first, as the old game wrote it
+    legacy = tmp_path / LEGACY_FILE
+    legacy.write_text("Score: 12 | Level: 3 | Time: 40s\n"
+                      "not a game\n"
+                      "Score: 4 | Level: 1 | Time: 9s\n"
+                      "Score: 30 | Level: 4 | Time: 95s\n")
+    store = HistoryStore(tmp_path).load()
+    assert [(e["score"], e["level"]) for e in store.entries()] == [(30, 4), (4, 1), (12, 3)]
+    assert all(e["time"] is None for e in store.entries())
+    assert store.count() == 3
+    assert [e["score"] for e in store.top()] == [30, 12, 4]
+    assert [e["score"] for e in store.recent()] == [12, 4, 30]
+    assert legacy.exists()
+    # Once there is a log the old file is ignored
+    store.append(game(0))
+    assert HistoryStore(tmp_path).load().count() == 4
@@ -0,0 +1,22 @@
+# The repo keeps CRLF line endings (see .gitattributes); a file saved with LF
+# would show up as a whole-file rewrite in the history.
+#
+#   python -m pytest tests
+import os
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+LF_FILES = {"LICENSE", ".gitignore"}  # Older than the convention
+
+def test_tracked_files_use_crlf():
+    names = subprocess.run(["git", "ls-files", "-z"], cwd=ROOT, capture_output=True,
+                           check=True).stdout.decode().split("\0")
+    wrong = []
+    for name in filter(None, names):
+        path = os.path.join(ROOT, name)
+        if name in LF_FILES or not os.path.exists(path):
+            continue
+        data = open(path, "rb").read()
+        if b"\0" not in data and data.count(b"\n") != data.count(b"\r\n"):
+            wrong.append(name)
+    assert not wrong, f"not CRLF: {wrong}"
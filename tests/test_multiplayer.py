@@ -0,0 +1,77 @@
+# Every client's ClientState, kept up to date from the server's messages
+# alone, must match the server's world after every tick.
+#
+#   python -m pytest tests
+import os
+import random
+import sys
+from collections import deque
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from net_protocol import DIRECTIONS, ClientState
+from snake_engine import BARRIER_CELL, FOOD_CELL
+from snake_server import MultiplayerWorld
+
+TICKS = 3000
+
+def world_view(world):
+    # What a client should hold: snakes, scores, food, bonus and blocked cells
+    snakes = {player: deque(world.cell(p) for p in snake.positions)
+              for player, snake in world.snakes.items()}
+    scores = {player: snake.score for player, snake in world.snakes.items()}
+    food = {world.cell(p) for p in world.foods}
+    bonus = {world.cell(world.bonus_food.position)} if world.bonus_food.active else set()
+    blocked = bytearray(world.width * world.height)
+    for cell, flags in enumerate(world.grid.cells):
+        blocked[cell] = (flags & BARRIER_CELL) + world.grid.snake[cell]
+    return snakes, scores, food, bonus, blocked
+
+def client_view(client):
+    return client.snakes, client.scores, client.food, client.bonus, client.blocked
+
+def test_clients_mirror_the_world():
+    # A small crowded board, so food is often eaten again in the tick it
+    # appeared and snakes keep dying and respawning
+    world = MultiplayerWorld(seed=7, width=40, height=30, level=3, food=60)
+    rng = random.Random(7)
+    clients = {}
+
+    def join():
+        player = world.join()
+        clients[player] = ClientState()
+        clients[player].apply(world.welcome(player))
+
+    for _ in range(20):
+        join()
+    for tick in range(TICKS):
+        for player in world.snakes:
+            if rng.random() < 0.3:
+                world.turn(player, rng.choice(DIRECTIONS))
+        if tick % 250 == 100:
+            join()
+        if tick % 250 == 200:
+            player = rng.choice(sorted(clients))
+            world.leave(player)
+            del clients[player]
+        message = world.tick()
+        expected = world_view(world)
+        for player, client in clients.items():
+            client.apply(message)
+            assert client.tick == world.ticks
+            assert client_view(client) == expected, f"player {player} drifted at tick {world.ticks}"
+
+def test_every_food_is_flagged():
+    # Each food's cell, and only those, carry FOOD_CELL. Seed 6 places one of
+    # the first foods on (0, 0), where new foods used to start out
+    world = MultiplayerWorld(seed=6, width=40, height=30, level=1, food=60)
+    rng = random.Random(6)
+    for _ in range(20):
+        world.join()
+    for _ in range(500):
+        flagged = {cell for cell, flags in enumerate(world.grid.cells) if flags & FOOD_CELL}
+        assert flagged == {world.cell(p) for p in world.foods}
+        for player in world.snakes:
+            if rng.random() < 0.3:
+                world.turn(player, rng.choice(DIRECTIONS))
+        world.tick()
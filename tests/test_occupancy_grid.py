@@ -0,0 +1,97 @@
+# OccupancyGrid keeps its free cells in a swap-remove array so spawns are
+# O(1); it must always hold exactly the cells a full scan finds free.
+#
+#   python -m pytest tests
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from autopilot import Autopilot
+from snake_engine import (BARRIER_CELL, BONUS_FOOD_CELL, FOOD_CELL, BonusFood, Food, GameEngine,
+                          OccupancyGrid)
+
+TICKS = 3000
+
+def assert_free_cells_exact(grid):
+    # free_cells holds every free cell once, free_slot points back at each
+    # and is -1 for the rest
+    free = [i for i in range(grid.width * grid.height) if not grid.cells[i] and not grid.snake[i]]
+    assert sorted(grid.free_cells) == free
+    for slot, i in enumerate(grid.free_cells):
+        assert grid.free_slot[i] == slot
+    taken = set(range(grid.width * grid.height)) - set(free)
+    assert all(grid.free_slot[i] == -1 for i in taken)
+
+def test_free_cells_follow_the_game():
+    # Growth, level-ups and bonus food coming and going, checked after every
+    # move. New walls land on the snake's body too; the game goes on until
+    # it moves off them.
+    walls_on_body = expired = level_ups = 0
+    for seed in range(3):
+        engine = GameEngine(seed)
+        pilot = Autopilot()
+        assert_free_cells_exact(engine.grid)
+        while engine.ticks < TICKS:
+            level = engine.level
+            bonus = engine.bonus_position
+            direction = pilot.choose(engine.grid, engine.positions, engine.food_position,
+                                     engine.length)
+            alive = engine.step(direction)
+            assert_free_cells_exact(engine.grid)
+            if not alive:
+                break
+            if engine.level != level:
+                level_ups += 1
+                walls_on_body += any(engine.grid.is_barrier(p) for p in engine.positions)
+            if bonus is not None and engine.bonus_position is None \
+                    and engine.positions[0] != bonus:
+                expired += 1
+    # The games must have covered what they are here to cover
+    assert level_ups and walls_on_body and expired
+
+def test_full_board():
+    # Fill a small board in random order, with folded snake segments and
+    # stacked flags, until no cell is free; then empty it again
+    grid = OccupancyGrid(7, 5)
+    rng = random.Random(3)
+    cells = [(x, y) for y in range(grid.height) for x in range(grid.width)]
+    rng.shuffle(cells)
+    food = Food(grid, rng)
+    assert food.randomize_position()
+    for pos in cells:
+        if grid.is_free(pos):
+            if rng.random() < 0.5:
+                grid.add_snake(pos)
+            else:
+                grid.set_flag(pos, BARRIER_CELL)
+        if rng.random() < 0.2:
+            grid.add_snake(pos)
+        assert_free_cells_exact(grid)
+    assert len(grid.free_cells) == 0
+    assert grid.random_free_cell(rng) is None
+    # New food and bonus food find no cell
+    assert not Food(grid, rng).randomize_position()
+    bonus = BonusFood(grid, clock=lambda: 0, rng=rng)
+    for _ in range(20):
+        bonus.spawn()
+    assert not bonus.active
+    assert_free_cells_exact(grid)
+
+    # One cell opening up is the one picked
+    pos = cells[0]
+    i = grid.index(pos)
+    while grid.snake[i]:
+        grid.remove_snake(pos)
+    grid.clear_flag(pos, BARRIER_CELL | FOOD_CELL | BONUS_FOOD_CELL)
+    assert_free_cells_exact(grid)
+    assert grid.random_free_cell(rng) == pos
+
+    for pos in cells:
+        i = grid.index(pos)
+        while grid.snake[i]:
+            grid.remove_snake(pos)
+        grid.clear_flag(pos, BARRIER_CELL | FOOD_CELL)
+        assert_free_cells_exact(grid)
+    assert len(grid.free_cells) == grid.width * grid.height
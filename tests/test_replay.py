@@ -0,0 +1,62 @@
+# A recorded game, written out and read back, must replay to the very same
+# game, including after seeking back and forth through it.
+#
+#   python -m pytest tests
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from autopilot import Autopilot
+from replay import Replay, ReplayPlayer
+from snake_engine import DOWN, LEFT, RIGHT, UP
+
+TICKS = 2000
+
+def state(game):
+    return (game.ticks, tuple(game.positions), game.direction, game.length, game.score,
+            game.food_position, game.bonus_position, game.level, game.cause)
+
+def record(seed):
+    # A game steered by the autopilot with the odd random turn, so it has
+    # many turns and usually ends in a crash. Returns the session and its
+    # state after every tick.
+    from snake_game import GameSession
+    session = GameSession(seed)
+    pilot = Autopilot()
+    rng = random.Random(seed)
+    states = {0: state(session)}
+    while session.ticks < TICKS:
+        if rng.random() < 0.02:
+            direction = rng.choice([UP, DOWN, LEFT, RIGHT])
+        else:
+            direction = pilot.choose(session.grid, session.positions, session.food_position,
+                                     session.length)
+        alive = session.step(direction)
+        states[session.ticks] = state(session)
+        if not alive:
+            break
+    return session, states
+
+def test_replay_round_trip_and_seek():
+    from snake_game import GameSession
+    for seed in range(3):
+        session, states = record(seed)
+        data = session.replay.encode()
+        replay = Replay.decode(data)
+        assert (replay.seed, replay.width, replay.height, replay.ticks, replay.turns) == \
+            (session.replay.seed, session.width, session.height, session.ticks,
+             session.replay.turns)
+        assert replay.encode() == data
+
+        player = ReplayPlayer(replay, GameSession)
+        end = replay.ticks
+        player.seek(end)
+        assert state(player.session) == states[end]
+        assert player.finished
+        # Back to before the first snapshot, between snapshots, onto one,
+        # forward past several, and to the end again
+        for tick in (7, end // 2, end // 3, 100, end - 1, 1, end):
+            player.seek(tick)
+            assert state(player.session) == states[tick], f"seed {seed} tick {tick}"